@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import bump_cache_version, get_cache_version, is_cache_shared
+from backend.db.replicas import use_primary
+
+AUTH_USER_VERSION_KEY = "auth_user_version:{user_id}"
+AUTH_TOKEN_KEY = "auth_token:{key_hash}"
+
+# Хэш пароля в снимок не попадает, при обращении к полю
+# оно загружается из БД
+SNAPSHOT_EXCLUDED_FIELDS = ("password",)
+
+
+def get_auth_user_version(user_id):
+    """Версия данных пользователя, от которых зависит аутентификация."""
+    return get_cache_version(AUTH_USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_auth_user(user_id):
+    """
+    Сбрасываем закэшированные токены пользователя.
+
+    Записи в кэше каждого процесса проверяют версию при чтении.
+    Версия хранится в общем кэше, поэтому её смена действует сразу
+    во всех процессах (без общего кэша CachedTokenAuthentication
+    не использует кэш пользователей).
+    """
+    bump_cache_version(AUTH_USER_VERSION_KEY.format(user_id=user_id))
+    token_user_cache.discard_user(user_id)
+
+
+class TokenUserCache:
+    """
+    Ограниченный LRU-кэш снимков пользователей по ключу токена.
+
+    Снимок — значения полей пользователя и дата создания токена,
+    из которых для каждого запроса собираются новые объекты.
+    Записи живут не дольше ttl секунд и считаются устаревшими
+    после смены версии пользователя. При shared=True снимки также
+    хранятся в общем кэше Django и доступны другим процессам.
+    """
+
+    def __init__(self, maxsize, ttl, shared=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @cached_property
+    def user_fields(self):
+        return [
+            field.attname
+            for field in get_user_model()._meta.concrete_fields
+            if field.attname not in SNAPSHOT_EXCLUDED_FIELDS
+        ]
+
+    @staticmethod
+    def get_shared_key(key):
+        # Ключи токенов не попадают в общий кэш в открытом виде
+        key_hash = sha256(key.encode()).hexdigest()
+        return AUTH_TOKEN_KEY.format(key_hash=key_hash)
+
+    def get_entry(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, entry = entry
+                if expires_at < time.monotonic():
+                    del self.entries[key]
+                    return None
+                self.entries.move_to_end(key)
+        if entry is None and self.shared:
+            entry = cache.get(self.get_shared_key(key))
+            if entry is not None:
+                self.store(key, entry)
+        return entry
+
+    def store(self, key, entry):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get(self, key, token_model):
+        """Получаем (user, token) или None, если снимка нет или он устарел."""
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        version, user_id, created, user_values = entry
+        if version != get_auth_user_version(user_id):
+            self.discard(key)
+            return None
+        user = get_user_model().from_db(
+            None, self.user_fields, user_values
+        )
+        token = token_model.from_db(
+            None, ["key", "user_id", "created"], [key, user_id, created]
+        )
+        token.user = user
+        return user, token
+
+    def set(self, key, user, token):
+        entry = (
+            get_auth_user_version(user.pk),
+            user.pk,
+            token.created,
+            tuple(getattr(user, field) for field in self.user_fields),
+        )
+        self.store(key, entry)
+        if self.shared:
+            cache.set(self.get_shared_key(key), entry, self.ttl)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.shared:
+            cache.delete(self.get_shared_key(key))
+
+    def discard_user(self, user_id):
+        """Удаляем из кэша процесса все токены пользователя."""
+        with self.lock:
+            for key in [
+                key for key, (_, entry) in self.entries.items()
+                if entry[1] == user_id
+            ]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_user_cache = TokenUserCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL,
+    shared=settings.AUTH_TOKEN_CACHE_SHARED,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшем пользователей.
+
+    Токен и пользователь читаются из БД только при промахе кэша,
+    неверные токены и неактивные пользователи не кэшируются.
+    Кэш работает только с общим для процессов кэшем Django: иначе
+    выход, смена пароля или деактивация были бы видны лишь процессу,
+    который их обработал, и остальные принимали бы отозванный токен.
+    Читаем с основной базы: реплика может не знать только что
+    выданный токен или ещё помнить удалённый.
+    """
+
+    def authenticate_credentials(self, key):
+        use_cache = is_cache_shared()
+        if use_cache:
+            cached = token_user_cache.get(key, self.get_model())
+            if cached is not None:
+                return cached
+        with use_primary():
+            user, token = super().authenticate_credentials(key)
+        if use_cache:
+            token_user_cache.set(key, user, token)
+        return user, token
@@ -0,0 +1,89 @@
+"""
+Общая часть команд замеров производительности (bench_*).
+
+Замер выполняется на отдельной тестовой базе: команда создаёт её
+по настройкам DATABASES, заполняет данными и удаляет после замера
+(с --keepdb база остаётся и повторно не заполняется). Чтение с реплик
+отключено, а ключи кэша получают свой префикс, поэтому данные замера
+не попадают в ответы рабочих серверов.
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+BENCHMARK_CACHE_PREFIX = "benchmark"
+
+
+def measure(func, repeat):
+    """Медиана времени вызова func в миллисекундах."""
+    times = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(times)
+
+
+class BenchmarkCommand(BaseCommand):
+    """
+    Команда замера на тестовой базе.
+
+    Наследники заполняют базу в seed() и выполняют замеры в run().
+    """
+
+    repeat = 5
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=self.repeat,
+            help="Количество повторов каждого замера.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Не удалять тестовую базу и не заполнять её повторно.",
+        )
+
+    def handle(self, *args, **options):
+        caches = {
+            alias: {**config, "KEY_PREFIX": BENCHMARK_CACHE_PREFIX}
+            for alias, config in settings.CACHES.items()
+        }
+        with override_settings(CACHES=caches, DATABASE_REPLICAS=[]):
+            old_name = connection.creation.create_test_db(
+                verbosity=0,
+                autoclobber=True,
+                serialize=False,
+                keepdb=options["keepdb"],
+            )
+            try:
+                if not options["keepdb"] or not self.is_seeded():
+                    started_at = time.monotonic()
+                    self.seed(options)
+                    self.stdout.write(
+                        f"seeded in {time.monotonic() - started_at:.1f} s"
+                    )
+                self.run(options)
+            finally:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=options["keepdb"]
+                )
+
+    def is_seeded(self):
+        return False
+
+    def seed(self, options):
+        raise NotImplementedError
+
+    def run(self, options):
+        raise NotImplementedError
+
+    def report(self, name, milliseconds, extra=""):
+        self.stdout.write(f"{name:55} {milliseconds:9.2f} ms {extra}")
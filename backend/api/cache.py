@@ -0,0 +1,70 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+RECIPES_VERSION_KEY = "recipes_version"
+CATALOG_VERSION_KEY = "catalog_version"
+USER_LISTS_VERSION_KEY = "user_lists_version:{user_id}"
+RESPONSE_CACHE_HITS_KEY = "response_cache_hits:{prefix}"
+RESPONSE_CACHE_MISSES_KEY = "response_cache_misses:{prefix}"
+
+# Бэкенды, данные которых не видны другим процессам
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_cache_shared():
+    """
+    Проверяем, что кэш общий для всех процессов.
+
+    Версии данных хранятся в кэше, поэтому только с общим кэшем
+    их смена в одном процессе видна остальным.
+    """
+    return (
+        settings.CACHES["default"]["BACKEND"]
+        not in PROCESS_LOCAL_CACHE_BACKENDS
+    )
+
+
+def get_cache_version(key):
+    """
+    Получаем текущую версию данных.
+
+    Версия входит в ключи кэша, поэтому после её смены
+    все старые записи перестают использоваться.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(key):
+    """Меняем версию данных, делая устаревшими все записи кэша."""
+    cache.set(key, uuid4().hex, None)
+
+
+def get_user_lists_version(user_id):
+    """Версия избранного, списка покупок и подписок пользователя."""
+    return get_cache_version(USER_LISTS_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_user_lists_version(user_id):
+    bump_cache_version(USER_LISTS_VERSION_KEY.format(user_id=user_id))
+
+
+def increment_counter(key):
+    """Увеличиваем счётчик в кэше, создавая его при отсутствии."""
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_counter(key):
+    return cache.get(key, 0)
@@ -1,29 +1,238 @@
+import sys
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (Case, Exists, F, IntegerField, OuterRef, Q,
+                              Value, When)
 from django_filters import rest_framework as filters
-from django_filters.filters import CharFilter, ModelMultipleChoiceFilter
+from django_filters.filters import (CharFilter, ChoiceFilter,
+                                    MultipleChoiceFilter)
 from django_filters.rest_framework import BooleanFilter
-from rest_framework.filters import SearchFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from api.cache import CATALOG_VERSION_KEY, get_cache_version
+from api.pagination import estimate_count
+from backend.db.replicas import use_primary
+from recipes.models import Recipe, RecipeTag, Tag, get_tags_mask
+
+TAGS_MATCH_ANY = "any"
+TAGS_MATCH_ALL = "all"
+TAGS_MATCH_CHOICES = (
+    (TAGS_MATCH_ANY, "Любой из тегов"),
+    (TAGS_MATCH_ALL, "Все теги"),
+)
+
+# Версия справочника и соответствие slug тегов их id
+tag_ids_cache = (None, {})
+
+
+def get_tag_ids_by_slug(slugs=()):
+    """
+    Получаем соответствие slug тегов их id.
+
+    Соответствие хранится в памяти процесса и перечитывается из БД
+    после изменения справочника тегов, а также если в нём нет
+    какого-то из slugs: тег мог быть создан в другом процессе.
+    """
+    global tag_ids_cache
+    version = get_cache_version(CATALOG_VERSION_KEY)
+    cached_version, tag_ids = tag_ids_cache
+    if cached_version != version or not tag_ids.keys() >= set(slugs):
+        with use_primary():
+            tag_ids = dict(Tag.objects.values_list("slug", "id"))
+        tag_ids_cache = (version, tag_ids)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
+
+
+class IngredientSearchIndex:
+    """
+    Индекс для поиска ингредиентов по началу и по вхождению названия.
+
+    Названия хранятся в отсортированном списке, поэтому совпадения
+    по началу находятся двоичным поиском. Затем перебором ищутся
+    названия, содержащие все слова запроса в любом порядке, — только
+    если совпадений по началу не хватило.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.names = [item["name"].lower() for item in items]
+        self.sorted_names = sorted(
+            (name, position) for position, name in enumerate(self.names)
+        )
+        self.keys = [name for name, _ in self.sorted_names]
 
-from recipes.models import Recipe, Tag
+    def search(self, query, limit=None):
+        """Находим ингредиенты: сначала по началу, затем по вхождению."""
+        terms = query.lower().split()
+        query = " ".join(terms)
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(sys.maxunicode), start)
+        positions = [
+            position for _, position in self.sorted_names[start:end]
+        ][:limit]
+        if limit is None or len(positions) < limit:
+            prefix_positions = set(positions)
+            for position, name in enumerate(self.names):
+                if (
+                    position not in prefix_positions
+                    and all(term in name for term in terms)
+                ):
+                    positions.append(position)
+                    if len(positions) == limit:
+                        break
+        return [self.items[position] for position in positions]
 
 
-class IngredientSearchFilter(SearchFilter):
-    """Фильтр для ингредиентов рецепта."""
+class IngredientSearchFilter(BaseFilterBackend):
+    """
+    Фильтр для ингредиентов рецепта.
+
+    Возвращает сначала ингредиенты, название которых начинается
+    с запроса, затем содержащие все его слова в любом порядке,
+    не больше limit штук.
+    """
 
     search_param = "name"
+    limit_param = "limit"
+    # Индекс последнего использованного списка ингредиентов
+    index = None
+
+    def get_search_query(self, request):
+        """Запрос в нижнем регистре, слова разделены одним пробелом."""
+        return " ".join(
+            request.query_params.get(self.search_param, "").lower().split()
+        )
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit > 0 else None
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        for term in query.split():
+            queryset = queryset.filter(name__icontains=term)
+        queryset = queryset.annotate(
+            prefix_rank=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by("prefix_rank", "name")
+        return queryset[:self.get_limit(request)]
+
+    def filter_catalog(self, request, items, view):
+        """Ищем в заранее сериализованном списке ингредиентов."""
+        query = self.get_search_query(request)
+        if not query:
+            return items
+        index = type(self).index
+        if index is None or index.items is not items:
+            index = type(self).index = IngredientSearchIndex(items)
+        return index.search(query, self.get_limit(request))
 
 
 class RecipeFilter(filters.FilterSet):
-    """Фильтр для рецептов."""
+    """
+    Фильтр для рецептов.
+
+    Теги проверяются подзапросом EXISTS, поэтому рецепт с несколькими
+    подходящими тегами попадает в выдачу один раз без DISTINCT.
+    Поиск применяется после остальных фильтров. Найденные рецепты
+    упорядочены по релевантности, если совпадений немного, иначе
+    по дате (как и при курсорной пагинации).
+    """
 
     author = CharFilter(field_name="author")
-    tags = ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        queryset=Tag.objects.all(),
-        to_field_name="slug",
-        conjoined=False,
+    tags = MultipleChoiceFilter(choices=get_tag_choices, method="filter_tags")
+    tags_match = ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES, method="filter_tags_match"
     )
     is_favorited = BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='filter_is_in_shopping_cart')
+    search = CharFilter(method="filter_search")
+
+    def __init__(self, data=None, *args, **kwargs):
+        super().__init__(data, *args, **kwargs)
+        slugs = data.getlist("tags") if data is not None else ()
+        if slugs:
+            # Варианты тегов проверяются по соответствию из памяти,
+            # обновляем его, если запрошен неизвестный процессу тег
+            get_tag_ids_by_slug(slugs)
+
+    def filter_tags(self, queryset, name, value):
+        # Соответствие могло обновиться после проверки формы
+        # (тег удалён в другом потоке), отвечаем как на неизвестный тег
+        tag_ids_by_slug = get_tag_ids_by_slug()
+        tag_ids = set()
+        for slug in value:
+            tag_id = tag_ids_by_slug.get(slug)
+            if tag_id is None:
+                raise ValidationError({name: [
+                    self.filters[name].field.error_messages[
+                        "invalid_choice"
+                    ] % {"value": slug}
+                ]})
+            tag_ids.add(tag_id)
+        match_all = self.form.cleaned_data.get("tags_match") == TAGS_MATCH_ALL
+        mask = get_tags_mask(tag_ids)
+        if settings.RECIPE_TAGS_MASK_FILTER and mask is not None:
+            queryset = queryset.alias(
+                matched_tags_mask=F("tags_mask").bitand(mask)
+            )
+            if match_all:
+                return queryset.filter(matched_tags_mask=mask)
+            return queryset.filter(matched_tags_mask__gt=0)
+        if match_all:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(Exists(RecipeTag.objects.filter(
+                    recipe=OuterRef("pk"), tag_id=tag_id
+                )))
+            return queryset
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef("pk"), tag_id__in=tag_ids
+        )))
+
+    def filter_search(self, queryset, name, value):
+        """
+        Ищем рецепты по названию и описанию.
+
+        В PostgreSQL используется поисковый вектор с русской морфологией
+        и запрос в синтаксисе websearch_to_tsquery, на других СУБД —
+        поиск подстроки.
+        """
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            )
+        query = SearchQuery(value, config="russian", search_type="websearch")
+        queryset = queryset.filter(search_vector=query)
+        # Ранжирование перебирает все совпадения, поэтому для частых
+        # слов оставляем порядок по дате, который читается по индексу
+        estimate = estimate_count(queryset)
+        if estimate is not None and (
+            estimate > settings.RECIPES_SEARCH_RANK_THRESHOLD
+        ):
+            return queryset
+        return queryset.annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        ).order_by("-search_rank", "-created_at", "-id")
+
+    def filter_tags_match(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -37,4 +246,11 @@ class RecipeFilter(filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "author",
+            "tags",
+            "tags_match",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+        )
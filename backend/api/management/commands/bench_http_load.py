@@ -0,0 +1,163 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncio.IncompleteReadError,
+    asyncio.LimitOverrunError,
+)
+
+
+async def read_response(reader):
+    """Читаем ответ HTTP/1.1 и возвращаем код статуса."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return int(status_line.split()[1])
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест запущенного сервера: клиенты с keep-alive "
+        "отправляют GET-запросы по одному адресу. Медленные клиенты "
+        "открывают соединение и не дописывают заголовки. Пример команды: "
+        "python manage.py bench_http_load --url http://127.0.0.1:8000"
+        "/api/tags/ --concurrency 16 --stalled 2"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", required=True, help="Адрес запроса.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Количество одновременных клиентов.",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=5,
+            help="Длительность теста в секундах.",
+        )
+        parser.add_argument(
+            "--token", help="Токен для заголовка Authorization."
+        )
+        parser.add_argument(
+            "--stalled",
+            type=int,
+            default=0,
+            help="Количество клиентов, не дописывающих заголовки.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=10,
+            help="Время ожидания ответа в секундах.",
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Поддерживаются только адреса http://.")
+        self.host = url.hostname
+        self.port = url.port or 80
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        headers = [f"GET {path} HTTP/1.1", f"Host: {url.netloc}"]
+        if options["token"]:
+            headers.append(f"Authorization: Token {options['token']}")
+        self.request = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+        latencies, errors, elapsed = asyncio.run(self.run(options))
+        latencies.sort()
+
+        def percentile(fraction):
+            if not latencies:
+                return float("nan")
+            index = min(len(latencies) - 1, int(fraction * len(latencies)))
+            return latencies[index] * 1000
+
+        median = statistics.median(latencies) * 1000 if latencies else 0
+        self.stdout.write(
+            f"{options['url']} concurrency={options['concurrency']} "
+            f"stalled={options['stalled']}: "
+            f"{len(latencies) / elapsed:.0f} req/s, "
+            f"p50 {median:.1f} ms, p99 {percentile(0.99):.1f} ms, "
+            f"errors {errors}"
+        )
+
+    async def stalled_client(self):
+        _, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(self.request.split(b"\r\n", 1)[0] + b"\r\n")
+        await writer.drain()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            writer.close()
+
+    async def client(self, deadline, timeout, latencies):
+        errors = 0
+        writer = None
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), timeout
+                    )
+                writer.write(self.request)
+                status = await asyncio.wait_for(
+                    read_response(reader), timeout
+                )
+            except CONNECTION_ERRORS:
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                continue
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        if writer is not None:
+            writer.close()
+        return errors
+
+    async def run(self, options):
+        stalled = [
+            asyncio.create_task(self.stalled_client())
+            for _ in range(options["stalled"])
+        ]
+        if stalled:
+            # Медленные клиенты должны занять воркеры до начала замера
+            await asyncio.sleep(0.5)
+        latencies = []
+        started = time.perf_counter()
+        errors = await asyncio.gather(*(
+            self.client(
+                started + options["duration"], options["timeout"], latencies
+            )
+            for _ in range(options["concurrency"])
+        ))
+        elapsed = time.perf_counter() - started
+        for task in stalled:
+            task.cancel()
+        await asyncio.gather(*stalled, return_exceptions=True)
+        return latencies, sum(errors), elapsed
@@ -0,0 +1,106 @@
+from itertools import cycle, islice
+
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.benchmarks import BenchmarkCommand, measure
+from api.filters import IngredientSearchFilter, IngredientSearchIndex
+from recipes.constants import MeasurementUnit
+from recipes.models import Ingredient
+
+WORDS = (
+    "соль", "сахар", "морская", "капуста", "фасоль", "белая", "мука",
+    "пшеничная", "масло", "сливочное", "перец", "чёрный", "молоко",
+    "томатная", "паста", "куриное", "филе", "рис", "круглый", "лук",
+)
+QUERIES = ("сол", "масло слив", "паста томатная", "ное фи", "нет такого")
+LIMIT = 10
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Замер поиска ингредиентов: индекс в памяти, запрос к БД "
+        "с ранжированием и прежний поиск подстроки без ограничения. "
+        "Пример команды: python manage.py bench_ingredient_search "
+        "--size 100000"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=100000,
+            help="Количество ингредиентов.",
+        )
+
+    def is_seeded(self):
+        return Ingredient.objects.exists()
+
+    def seed(self, options):
+        pairs = (
+            (first, second)
+            for first in WORDS for second in WORDS if first != second
+        )
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=f"{first} {second} {number}",
+                    measurement_unit=MeasurementUnit.G,
+                )
+                for number, (first, second) in enumerate(
+                    islice(cycle(pairs), options["size"])
+                )
+            ),
+            batch_size=5000,
+        )
+
+    def run(self, options):
+        repeat = options["repeat"]
+        items = list(Ingredient.objects.values("id", "name",
+                                               "measurement_unit"))
+        self.report(
+            f"build index ({len(items)} names)",
+            measure(lambda: IngredientSearchIndex(items), 1),
+        )
+        index = IngredientSearchIndex(items)
+        search_filter = IngredientSearchFilter()
+        factory = APIRequestFactory()
+        client = APIClient()
+        # Первый запрос строит каталог и индекс процесса
+        client.get("/api/ingredients/", {"name": QUERIES[0]})
+        for query in QUERIES:
+            request = Request(
+                factory.get("/", {"name": query, "limit": LIMIT})
+            )
+            self.report(
+                f"{query!r}: index top-{LIMIT}",
+                measure(lambda: index.search(query, LIMIT), repeat),
+            )
+            self.report(
+                f"{query!r}: API top-{LIMIT}",
+                measure(
+                    lambda: client.get(
+                        "/api/ingredients/", {"name": query, "limit": LIMIT}
+                    ),
+                    repeat,
+                ),
+            )
+            self.report(
+                f"{query!r}: DB ranked top-{LIMIT}",
+                measure(
+                    lambda: list(search_filter.filter_queryset(
+                        request, Ingredient.objects.all(), None
+                    )),
+                    repeat,
+                ),
+            )
+            self.report(
+                f"{query!r}: DB icontains, all matches (old)",
+                measure(
+                    lambda: list(Ingredient.objects.filter(
+                        name__icontains=query
+                    ).values("id", "name", "measurement_unit")),
+                    repeat,
+                ),
+            )
@@ -0,0 +1,181 @@
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from api.benchmarks import BenchmarkCommand, measure
+from api.filters import RecipeFilter
+from recipes.models import (Recipe, RecipeTag, Tag, UserFavorite,
+                            UserShoppingList, get_tags_mask)
+from users.models import FoodgramUser
+
+DISHES = (
+    "суп", "борщ", "салат", "пирог", "котлеты", "плов", "омлет", "рагу",
+    "каша", "блины", "пицца", "паста", "запеканка", "шашлык", "уха",
+    "солянка", "голубцы", "пельмени", "вареники", "сырники", "гуляш",
+    "оладьи", "торт", "хачапури", "лазанья", "окрошка", "щи", "харчо",
+)
+ADJECTIVES = (
+    "куриный", "овощной", "грибной", "домашний", "быстрый", "летний",
+    "острый", "сырный", "томатный", "рыбный", "мясной", "постный",
+    "сладкий", "праздничный", "картофельный", "тыквенный", "творожный",
+    "шоколадный", "ягодный", "лимонный", "деревенский", "сливочный",
+)
+WORDS = (
+    "нарежьте", "обжарьте", "добавьте", "варите", "посолите",
+    "перемешайте", "запекайте", "остудите", "подавайте", "измельчите",
+    "взбейте", "тушите", "залейте", "натрите", "выложите", "отварите",
+    "лук", "морковь", "картофель", "чеснок", "масло", "соль", "перец",
+    "мука", "яйца", "молоко", "сметана", "сыр", "курица", "говядина",
+    "рыба", "капуста", "свёкла", "томаты", "зелень", "укроп", "сахар",
+    "сливки", "грибы", "рис", "фасоль", "лимон", "мёд", "корица", "ваниль",
+    "бульон", "вода", "сковорода", "кастрюля", "духовка", "минут", "до",
+    "золотистой", "корочки", "мелко", "кубиками", "на", "среднем", "огне",
+    "под", "крышкой", "готовности", "вкусу", "аккуратно", "горячим",
+)
+TAGS_COUNT = 12
+AUTHORS_COUNT = 100
+CASES = (
+    {"search": "харчо"},
+    {"search": "суп"},
+    {"search": "куриный суп"},
+    {"search": '"куриный суп"'},
+    {"search": "нарежьте"},
+    {"search": "корицей ванилью"},
+    {"search": "суп", "tags": "tag3"},
+    {"search": "суп", "is_favorited": 1},
+    {"search": "суп", "is_in_shopping_cart": 1},
+    {"search": "суп", "page": 20},
+)
+# Случаи, на которых сравнивается прежний поиск подстроки
+BASELINE_CASES = CASES[:3]
+
+
+def choose(randomizer, words, power):
+    """Выбираем слово: начало списка встречается чаще."""
+    return words[int(randomizer.random() ** power * len(words))]
+
+
+def filter_search_icontains(self, queryset, name, value):
+    return queryset.filter(Q(name__icontains=value) | Q(text__icontains=value))
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Замер полнотекстового поиска рецептов /api/recipes/?search= "
+        "в PostgreSQL: время ответа и количество найденных рецептов. "
+        "Пример команды: python manage.py bench_recipe_search "
+        "--size 100000 --baseline"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=100000,
+            help="Количество рецептов.",
+        )
+        parser.add_argument(
+            "--baseline",
+            action="store_true",
+            help="Сравнить с поиском подстроки по названию и описанию.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Поиск по вектору работает в PostgreSQL.")
+        super().handle(*args, **options)
+
+    def is_seeded(self):
+        return Recipe.objects.exists()
+
+    def seed(self, options):
+        user = FoodgramUser.objects.create_user(
+            username="bench", email="bench@example.com", password="bench"
+        )
+        authors = [user] + [
+            FoodgramUser.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com",
+                password="bench",
+            )
+            for number in range(AUTHORS_COUNT - 1)
+        ]
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Тег {number}", slug=f"tag{number}")
+            for number in range(1, TAGS_COUNT + 1)
+        )
+        randomizer = random.Random(0)
+        recipes = []
+        for number in range(options["size"]):
+            recipes.append(Recipe(
+                author=authors[number % AUTHORS_COUNT],
+                name=(
+                    f"{choose(randomizer, ADJECTIVES, 2).capitalize()} "
+                    f"{choose(randomizer, DISHES, 1.5)}"
+                ),
+                text=" ".join(
+                    choose(randomizer, WORDS, 2)
+                    for _ in range(30 + number % 31)
+                ),
+                cooking_time=1 + number % 100,
+                image="recipes/images/recipe.png",
+                tags_mask=get_tags_mask([tags[number % TAGS_COUNT].id]) or 0,
+            ))
+        # Поисковый вектор заполняет триггер
+        Recipe.objects.bulk_create(recipes, batch_size=5000)
+        RecipeTag.objects.bulk_create(
+            (
+                RecipeTag(recipe=recipe, tag=tags[number % TAGS_COUNT])
+                for number, recipe in enumerate(recipes)
+            ),
+            batch_size=5000,
+        )
+        UserFavorite.objects.bulk_create(
+            UserFavorite(user=user, recipe=recipe) for recipe in recipes[::50]
+        )
+        UserShoppingList.objects.bulk_create(
+            UserShoppingList(user=user, recipe=recipe)
+            for recipe in recipes[::100]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def run(self, options):
+        client = APIClient()
+        client.force_authenticate(FoodgramUser.objects.get(username="bench"))
+        self.stdout.write(f"recipes: {Recipe.objects.count()}")
+        for params in CASES:
+            self.measure_case(client, params, options["repeat"])
+        if options["baseline"]:
+            self.stdout.write("-- icontains по названию и описанию")
+            with mock.patch.object(
+                RecipeFilter, "filter_search", filter_search_icontains
+            ):
+                for params in BASELINE_CASES:
+                    self.measure_case(client, params, options["repeat"])
+
+    def measure_case(self, client, params, repeat):
+        responses = []
+
+        def search():
+            # Кэш справочников и ответов не должен влиять на замер
+            cache.clear()
+            responses.append(client.get("/api/recipes/", params))
+
+        milliseconds = measure(search, repeat)
+        response = responses[-1]
+        if response.status_code != 200:
+            raise CommandError(
+                f"{params}: {response.status_code} {response.content!r}"
+            )
+        data = response.json()
+        estimated = "" if data.get("count_is_exact", True) else " (est.)"
+        self.report(
+            str(params), milliseconds, f"{data['count']} found{estimated}"
+        )
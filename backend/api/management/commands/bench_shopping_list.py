@@ -0,0 +1,97 @@
+import random
+
+from rest_framework.test import APIClient
+
+from api.benchmarks import BenchmarkCommand, measure
+from api.recipes_utils import SHOPPING_CART_FORMATS
+from recipes.constants import MeasurementUnit
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            UserShoppingList)
+from users.models import FoodgramUser
+
+INGREDIENTS_PER_RECIPE = 10
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Замер выгрузки списка покупок в форматах txt, csv и pdf: "
+        "время ответа и размер файла. "
+        "Пример команды: python manage.py bench_shopping_list "
+        "--recipes 1000"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=1000,
+            help=(
+                "Количество рецептов в списке покупок, "
+                f"в каждом {INGREDIENTS_PER_RECIPE} ингредиентов."
+            ),
+        )
+
+    def is_seeded(self):
+        return UserShoppingList.objects.exists()
+
+    def seed(self, options):
+        user = FoodgramUser.objects.create_user(
+            username="bench", email="bench@example.com", password="bench"
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"ингредиент {number}",
+                measurement_unit=MeasurementUnit.G,
+            )
+            for number in range(options["recipes"] * 2)
+        )
+        ingredients = list(Ingredient.objects.all())
+        # bulk_create в SQLite не возвращает id созданных рецептов
+        recipes = [
+            Recipe.objects.create(
+                author=user,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+            )
+            for number in range(options["recipes"])
+        ]
+        randomizer = random.Random(0)
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=randomizer.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in randomizer.sample(
+                    ingredients, INGREDIENTS_PER_RECIPE
+                )
+            ),
+            batch_size=5000,
+        )
+        UserShoppingList.objects.bulk_create(
+            UserShoppingList(user=user, recipe=recipe) for recipe in recipes
+        )
+
+    def run(self, options):
+        client = APIClient()
+        client.force_authenticate(FoodgramUser.objects.get(username="bench"))
+        for file_format in SHOPPING_CART_FORMATS:
+            sizes = []
+
+            def download():
+                response = client.get(
+                    "/api/recipes/download_shopping_cart/",
+                    {"format": file_format},
+                )
+                sizes.append(len(b"".join(response.streaming_content)))
+
+            self.report(
+                f"download {file_format}",
+                measure(download, options["repeat"]),
+                f"{sizes[-1] / 1024:.1f} KB",
+            )
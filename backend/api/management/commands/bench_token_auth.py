@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication, token_user_cache
+from api.benchmarks import BenchmarkCommand, measure
+from api.cache import is_cache_shared
+from recipes.models import Tag
+from users.models import FoodgramUser
+
+PATHS = ("/api/tags/", "/api/users/me/")
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Замер запросов с токеном: стандартная TokenAuthentication "
+        "и CachedTokenAuthentication (кэш процесса и общий кэш). "
+        "Кэш пользователей работает только с общим CACHE_BACKEND. "
+        "Пример команды: CACHE_BACKEND=... python manage.py "
+        "bench_token_auth --requests 2000"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Количество запросов в каждом замере.",
+        )
+
+    def is_seeded(self):
+        return Token.objects.exists()
+
+    def seed(self, options):
+        user = FoodgramUser.objects.create_user(
+            username="bench", email="bench@example.com", password="bench"
+        )
+        Token.objects.create(user=user)
+        Tag.objects.bulk_create(
+            Tag(name=f"Тег {number}", slug=f"tag{number}")
+            for number in range(10)
+        )
+
+    def run(self, options):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.get().key}"
+        )
+        requests_count = options["requests"]
+        cache_kind = "shared" if is_cache_shared() else "process-local"
+        self.stdout.write(f"Django cache: {cache_kind}")
+        cases = (
+            ("stock", TokenAuthentication, False),
+            ("cached", CachedTokenAuthentication, False),
+            ("cached+shared", CachedTokenAuthentication, True),
+        )
+        for path in PATHS:
+            for name, authentication_class, shared in cases:
+                token_user_cache.clear()
+                with mock.patch.object(
+                    APIView, "authentication_classes", [authentication_class]
+                ), mock.patch.object(token_user_cache, "shared", shared):
+                    client.get(path)
+                    with CaptureQueriesContext(connection) as queries:
+                        response = client.get(path)
+                    if response.status_code != 200:
+                        raise CommandError(
+                            f"{path}: {response.status_code} "
+                            f"{response.content!r}"
+                        )
+                    # Журнал запросов очищается в начале каждого запроса
+                    queries_count = len(queries)
+
+                    def send_requests():
+                        for _ in range(requests_count):
+                            client.get(path)
+
+                    milliseconds = measure(send_requests, options["repeat"])
+                self.report(
+                    f"{path} {name}",
+                    milliseconds / requests_count,
+                    f"{requests_count * 1000 / milliseconds:.0f} req/s, "
+                    f"{queries_count} queries",
+                )
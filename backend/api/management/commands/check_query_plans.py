@@ -0,0 +1,163 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import BooleanField, Sum, Value
+from django.test import RequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+# Таблицы, которые нельзя читать целиком на горячих путях
+LARGE_TABLES = (
+    "recipes_recipe",
+    "recipes_recipetag",
+    "recipes_recipeingredient",
+    "recipes_userfavorite",
+    "recipes_usershoppinglist",
+    "users_usersubscriptions",
+)
+PAGE_SIZE = 10
+
+
+def walk_plan(plan):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from walk_plan(child)
+
+
+def filter_recipes(user, params):
+    request = RequestFactory().get("/api/recipes/", params)
+    request.user = user
+    queryset = Recipe.objects.with_user_flags(user)
+    return RecipeFilter(
+        request.GET, queryset=queryset, request=request
+    ).qs[:PAGE_SIZE]
+
+
+def get_querysets(user):
+    """Запросы горячих путей и допустимость сортировки в них."""
+    tags = list(Tag.objects.values_list("slug", flat=True)[:2])
+    author = Recipe.objects.values_list("author_id", flat=True).first()
+    yield "recipes list", filter_recipes(user, {}), False
+    yield (
+        "recipes list by author",
+        filter_recipes(user, {"author": author or user.id}),
+        False,
+    )
+    yield (
+        "recipes list by tags",
+        filter_recipes(user, {"tags": tags}),
+        False,
+    )
+    # Списки пользователя короткие, их сортировка допустима
+    yield (
+        "recipes list is_favorited",
+        filter_recipes(user, {"is_favorited": 1}),
+        True,
+    )
+    yield (
+        "recipes list is_in_shopping_cart",
+        filter_recipes(user, {"is_in_shopping_cart": 1}),
+        True,
+    )
+    subscriptions = user.subscriptions.annotate(
+        is_subscribed=Value(True, output_field=BooleanField()),
+    )[:PAGE_SIZE]
+    yield "subscriptions", subscriptions, True
+    authors = list(user.subscriptions.values_list("id", flat=True)[:10])
+    yield (
+        "subscriptions recipes",
+        Recipe.objects.for_card("author_id").limited_per_author(
+            authors or [user.id], 3
+        ),
+        True,
+    )
+    shopping_cart = RecipeIngredient.objects.filter(
+        recipe__usershoppinglist__user=user
+    ).values(
+        "ingredient__name", "ingredient__measurement_unit"
+    ).annotate(
+        amount=Sum("amount")
+    ).order_by("ingredient__name")
+    yield "shopping cart", shopping_cart, True
+
+
+def explain(queryset):
+    """План запроса в формате JSON (корневой узел)."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def check_plan(plan, allow_sort):
+    """
+    Проблемы плана: последовательное сканирование больших таблиц
+    и сортировка там, где строки должны читаться в порядке индекса.
+    """
+    problems = []
+    for node in walk_plan(plan):
+        node_type = node["Node Type"]
+        relation = node.get("Relation Name")
+        if node_type == "Seq Scan" and relation in LARGE_TABLES:
+            problems.append(f"Seq Scan on {relation}")
+        if node_type in ("Sort", "Incremental Sort") and not allow_sort:
+            problems.append(f"{node_type} by {node.get('Sort Key')}")
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка планов основных запросов API через EXPLAIN. "
+        "Запускается на PostgreSQL с заполненной большой базой, "
+        "завершается ошибкой при последовательном сканировании "
+        "больших таблиц или лишней сортировке. "
+        "Пример команды: python manage.py check_query_plans --analyze"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Обновить статистику таблиц перед проверкой.",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Выводить полный план каждого запроса.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Проверка планов работает только с PostgreSQL")
+        if options["analyze"]:
+            with connection.cursor() as cursor:
+                for table in LARGE_TABLES:
+                    cursor.execute(f"ANALYZE {table}")
+
+        user = User.objects.filter(
+            usershoppinglist__isnull=False
+        ).first() or User.objects.first()
+        if user is None:
+            raise CommandError("Для проверки нужна заполненная база")
+
+        errors = []
+        for name, queryset, allow_sort in get_querysets(user):
+            plan = explain(queryset)
+            if options["verbose_plans"]:
+                self.stdout.write(json.dumps(plan, indent=2))
+            problems = check_plan(plan, allow_sort)
+            if problems:
+                errors.append(f"{name}: {', '.join(problems)}")
+                self.stdout.write(self.style.ERROR(f"{name}: FAIL"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+        if errors:
+            raise CommandError("\n".join(errors))
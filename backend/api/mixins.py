@@ -1,4 +1,18 @@
-from rest_framework import mixins, viewsets
+import json
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import mixins, status, viewsets
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from api.cache import (CATALOG_VERSION_KEY, RECIPES_VERSION_KEY,
+                       RESPONSE_CACHE_HITS_KEY, RESPONSE_CACHE_MISSES_KEY,
+                       get_cache_version, increment_counter)
+from backend.db.replicas import use_primary
 
 
 class GetListViewSet(
@@ -7,3 +21,171 @@ class GetListViewSet(
         viewsets.GenericViewSet,
 ):
     """ViewSet для методов Get, List"""
+
+
+class CatalogCacheMixin:
+    """
+    Отдаём справочник из заранее сериализованного списка в памяти процесса.
+
+    Список пересобирается при смене версии справочников и не реже
+    раза в catalog_ttl секунд: без общего кэша смена версии видна
+    только процессу, который изменил данные. ETag строится
+    из содержимого списка и параметров запроса, поэтому совпадает
+    во всех процессах, и повторный запрос с If-None-Match получает 304
+    без обращения к БД. Last-Modified — время, когда процесс впервые
+    собрал список с текущим содержимым; If-Modified-Since проверяется,
+    только если клиент не прислал If-None-Match.
+    """
+
+    catalog_version_key = CATALOG_VERSION_KEY
+    catalog_max_age = settings.CATALOG_CACHE_MAX_AGE
+    catalog_ttl = settings.CATALOG_CACHE_TTL
+    # (версия, срок годности, сериализованный список, хэш списка,
+    # время изменения) — своя запись у каждого класса
+    catalog = None
+
+    def get_catalog(self, version):
+        """
+        Получаем сериализованный список, хэш его содержимого
+        и время его изменения.
+        """
+        catalog = type(self).catalog
+        if (
+            catalog is None
+            or catalog[0] != version
+            or catalog[1] < time.monotonic()
+        ):
+            # Реплика может ещё не получить изменения новой версии,
+            # поэтому список собирается по основной базе
+            with use_primary():
+                items = list(
+                    self.get_serializer(self.get_queryset(), many=True).data
+                )
+            digest = md5(
+                json.dumps(items, ensure_ascii=False).encode("utf-8")
+            ).hexdigest()
+            modified = int(time.time())
+            if catalog is not None and catalog[3] == digest:
+                # Данные не изменились, сохраняем прежний список,
+                # чтобы не перестраивать построенные по нему индексы
+                items = catalog[2]
+                modified = catalog[4]
+            catalog = type(self).catalog = (
+                version,
+                time.monotonic() + self.catalog_ttl,
+                items,
+                digest,
+                modified,
+            )
+        return catalog[2], catalog[3], catalog[4]
+
+    def filter_catalog(self, items):
+        for backend in self.filter_backends:
+            backend = backend()
+            if hasattr(backend, "filter_catalog"):
+                items = backend.filter_catalog(self.request, items, self)
+        return items
+
+    def get_etag(self, request, catalog_digest):
+        params = sorted(
+            (param, sorted(values))
+            for param, values in request.query_params.lists()
+        )
+        digest = md5(
+            json.dumps([request.path, params]).encode("utf-8")
+        ).hexdigest()
+        return f'"{catalog_digest}-{digest}"'
+
+    def get_catalog_response(self, request, get_data):
+        version = get_cache_version(self.catalog_version_key)
+        items, catalog_digest, modified = self.get_catalog(version)
+        etag = self.get_etag(request, catalog_digest)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(modified),
+            "Cache-Control": f"public, max-age={self.catalog_max_age}",
+        }
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            not_modified = etag in parse_etags(if_none_match)
+        else:
+            if_modified_since = parse_http_date_safe(
+                request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+            )
+            not_modified = (
+                if_modified_since is not None
+                and modified <= if_modified_since
+            )
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return Response(get_data(items), headers=headers)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(request, self.filter_catalog)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+
+        def get_item(items):
+            for item in items:
+                if str(item["id"]) == pk:
+                    return item
+            raise NotFound()
+
+        return self.get_catalog_response(request, get_item)
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Кэшируем ответы list и retrieve для анонимных пользователей.
+
+    Ключ кэша строится из адреса, нормализованных параметров запроса
+    и версии данных, поэтому запись устаревает при любом изменении данных.
+    """
+
+    response_cache_prefix = "recipes"
+    response_cache_version_key = RECIPES_VERSION_KEY
+    response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_response_cache_key(self, request):
+        params = sorted(
+            (param, sorted(values))
+            for param, values in request.query_params.lists()
+        )
+        key = [
+            request.build_absolute_uri(request.path),
+            params,
+            get_cache_version(self.response_cache_version_key),
+        ]
+        return f"response:{self.response_cache_prefix}:" + md5(
+            json.dumps(key).encode("utf-8")
+        ).hexdigest()
+
+    def get_cached_response(self, method, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return method(request, *args, **kwargs)
+        prefix = self.response_cache_prefix
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            increment_counter(RESPONSE_CACHE_HITS_KEY.format(prefix=prefix))
+            return Response(data, headers={"X-Cache": "HIT"})
+        # Ответ хранится до смены версии, поэтому не читаем его с реплики
+        with use_primary():
+            response = method(request, *args, **kwargs)
+        increment_counter(RESPONSE_CACHE_MISSES_KEY.format(prefix=prefix))
+        if response.status_code == 200:
+            cache.set(key, response.data, self.response_cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
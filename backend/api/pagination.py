@@ -1,9 +1,271 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from functools import partial
+from hashlib import md5
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.cache import (RECIPES_VERSION_KEY, get_cache_version,
+                       get_user_lists_version)
+
+
+def estimate_count(queryset):
+    """
+    Получаем оценку количества строк от планировщика PostgreSQL.
+
+    Для других СУБД возвращаем None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class EstimatedPage(Page):
+    """Страница, наличие следующей страницы для которой известно заранее."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator с заранее полученным количеством объектов.
+
+    Если количество приблизительное, номер страницы не ограничивается
+    сверху, а наличие следующей страницы определяется по лишней строке.
+    """
+
+    def __init__(self, object_list, per_page, count, count_is_exact):
+        super().__init__(object_list, per_page)
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("Номер страницы не является числом")
+        if number < 1:
+            raise EmptyPage("Номер страницы меньше 1")
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        return EstimatedPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
 
 
 class FoodgramPagination(PageNumberPagination):
-    """Пагинация c переметром limit."""
+    """
+    Пагинация c переметром limit.
+
+    При передаче параметра cursor включается курсорная пагинация
+    по паре (cursor_field, id) от новых записей к старым: каждая страница
+    получается одним индексным запросом без OFFSET и COUNT.
+    """
 
     page_size_query_param = "limit"
     page_size = settings.DEFAULT_PAGE_SIZE
+    cursor_query_param = "cursor"
+    cursor_field = "created_at"
+    invalid_cursor_message = "Неверный курсор"
+    # Время жизни закэшированного количества объектов, None — не кэшируем
+    count_cache_timeout = None
+    # Начиная с этой оценки планировщика количество не пересчитывается,
+    # None — всегда считаем точно
+    count_estimate_threshold = None
+    # Параметры фильтрации, результат которых зависит от пользователя
+    user_filter_params = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if self.use_cursor:
+            return self.paginate_queryset_by_cursor(queryset, request)
+        if (
+            self.count_cache_timeout is not None
+            or self.count_estimate_threshold is not None
+        ):
+            count, count_is_exact = self.get_count(queryset, request)
+            self.django_paginator_class = partial(
+                CountedPaginator, count=count, count_is_exact=count_is_exact
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            paginator = self.page.paginator
+            return Response(OrderedDict([
+                ("count", paginator.count),
+                ("count_is_exact", getattr(
+                    paginator, "count_is_exact", True
+                )),
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+                ("results", data),
+            ]))
+        return Response(OrderedDict([
+            ("next", self.next_url),
+            ("previous", self.previous_url),
+            ("results", data),
+        ]))
+
+    def get_count_cache_key(self, request):
+        """
+        Формируем ключ кэша из пути и нормализованного набора фильтров.
+
+        Ключ меняется вместе с версией рецептов, а для фильтров,
+        зависящих от пользователя, ещё и с версией его списков.
+        """
+        ignored_params = (
+            self.page_query_param,
+            self.page_size_query_param,
+            self.cursor_query_param,
+        )
+        params = sorted(
+            (param, sorted(set(filter(None, values))))
+            for param, values in request.query_params.lists()
+            if param not in ignored_params
+        )
+        key = [request.path, params, get_cache_version(RECIPES_VERSION_KEY)]
+        user = request.user
+        if user.is_authenticated and any(
+            param in self.user_filter_params for param, _ in params
+        ):
+            key += [user.id, get_user_lists_version(user.id)]
+        return "pagination_count:" + md5(
+            json.dumps(key).encode("utf-8")
+        ).hexdigest()
+
+    def get_count(self, queryset, request):
+        """
+        Получаем количество объектов и признак его точности.
+
+        Сначала ищем значение в кэше, затем при большой оценке
+        планировщика используем её вместо COUNT(*).
+        """
+        key = self.get_count_cache_key(request)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        result = None
+        if self.count_estimate_threshold is not None:
+            estimate = estimate_count(queryset)
+            threshold = self.count_estimate_threshold
+            if estimate is not None and estimate > threshold:
+                result = (estimate, False)
+        if result is None:
+            result = (queryset.count(), True)
+        if self.count_cache_timeout is not None:
+            cache.set(key, result, self.count_cache_timeout)
+        return result
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        """Получаем страницу, следующую за позицией из курсора."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        field = self.cursor_field
+        if reverse:
+            queryset = queryset.order_by(field, "id")
+        else:
+            queryset = queryset.order_by(f"-{field}", "-id")
+        if position is not None:
+            value, pk = position
+            lookup = "gt" if reverse else "lt"
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": value})
+                | Q(**{field: value, f"id__{lookup}": pk})
+            )
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_url = self.previous_url = None
+        if results:
+            if has_more or reverse:
+                self.next_url = self.encode_cursor(results[-1], False)
+            if (has_more and reverse) or (position and not reverse):
+                self.previous_url = self.encode_cursor(results[0], True)
+        return results
+
+    def decode_cursor(self, cursor):
+        """Декодируем курсор в позицию (значение поля, id) и направление."""
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+            value = parse_datetime(data["v"])
+            pk = int(data["id"])
+            reverse = bool(data.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), reverse
+
+    def encode_cursor(self, obj, reverse):
+        """Формируем ссылку на страницу после (или перед) объектом."""
+        data = {
+            "v": getattr(obj, self.cursor_field).isoformat(),
+            "id": obj.pk,
+        }
+        if reverse:
+            data["r"] = 1
+        cursor = urlsafe_b64encode(
+            json.dumps(data, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class UserPagination(FoodgramPagination):
+    """Пагинация пользователей, курсор по дате регистрации."""
+
+    cursor_field = "date_joined"
+
+
+class RecipePagination(FoodgramPagination):
+    """Пагинация рецептов с кэшированным и оценочным количеством."""
+
+    count_cache_timeout = settings.RECIPES_COUNT_CACHE_TIMEOUT
+    count_estimate_threshold = settings.RECIPES_COUNT_ESTIMATE_THRESHOLD
+    user_filter_params = ("is_favorited", "is_in_shopping_cart")
@@ -0,0 +1,465 @@
+import re
+import struct
+import zlib
+from functools import lru_cache
+from hashlib import md5
+from pathlib import Path
+
+# Таблицы TrueType, которые PDF использует для вывода глифов
+# (ISO 32000-1, 9.9); cmap не нужна, глифы выбираются по номерам
+SUBSET_TABLES = ("cvt ", "fpgm", "glyf", "head", "hhea", "hmtx", "loca",
+                 "maxp", "prep")
+
+# Флаги компонента составного глифа
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+class TrueTypeFont:
+    """
+    TrueType-шрифт для встраивания в PDF.
+
+    Из файла читаются только таблицы, нужные для вывода текста:
+    соответствие символов глифам (cmap), ширины глифов и метрики.
+    В документ встраивается подмножество шрифта с использованными
+    глифами (subset).
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as font_file:
+            self.data = font_file.read()
+        self.name = re.sub(r"[^A-Za-z0-9-]", "", Path(path).stem) or "Font"
+        self.tables = self.read_tables()
+
+        head = self.tables["head"]
+        self.units_per_em = self.unpack(">H", head + 18)
+        self.bbox = [
+            self.scale(value)
+            for value in struct.unpack_from(">4h", self.data, head + 36)
+        ]
+        hhea = self.tables["hhea"]
+        self.ascent = self.scale(self.unpack(">h", hhea + 4))
+        self.descent = self.scale(self.unpack(">h", hhea + 6))
+        metrics_count = self.unpack(">H", hhea + 34)
+        hmtx = self.tables["hmtx"]
+        self.widths = [
+            self.scale(self.unpack(">H", hmtx + index * 4))
+            for index in range(metrics_count)
+        ]
+        self.glyphs = self.read_cmap()
+
+    def unpack(self, fmt, offset):
+        return struct.unpack_from(fmt, self.data, offset)[0]
+
+    def scale(self, value):
+        """Переводим значение в единицы PDF (1000 на кегль)."""
+        return round(value * 1000 / self.units_per_em)
+
+    def read_tables(self):
+        tables_count = self.unpack(">H", 4)
+        tables = {}
+        self.table_lengths = {}
+        for index in range(tables_count):
+            tag, _, offset, length = struct.unpack_from(
+                ">4sIII", self.data, 12 + index * 16
+            )
+            tag = tag.decode("latin-1")
+            tables[tag] = offset
+            self.table_lengths[tag] = length
+        return tables
+
+    def get_table(self, tag):
+        offset = self.tables[tag]
+        return self.data[offset:offset + self.table_lengths[tag]]
+
+    def read_cmap(self):
+        """Читаем таблицу cmap формата 4 (Unicode BMP)."""
+        cmap = self.tables["cmap"]
+        for index in range(self.unpack(">H", cmap + 2)):
+            platform, encoding, offset = struct.unpack_from(
+                ">HHI", self.data, cmap + 4 + index * 8
+            )
+            subtable = cmap + offset
+            if (
+                (platform, encoding) in ((3, 1), (0, 3))
+                and self.unpack(">H", subtable) == 4
+            ):
+                return self.read_cmap_format_4(subtable)
+        raise ValueError("В шрифте нет таблицы cmap для Unicode")
+
+    def read_cmap_format_4(self, subtable):
+        segments = self.unpack(">H", subtable + 6) // 2
+        ends = subtable + 14
+        starts = ends + segments * 2 + 2
+        deltas = starts + segments * 2
+        range_offsets = deltas + segments * 2
+        glyphs = {}
+        for segment in range(segments):
+            end = self.unpack(">H", ends + segment * 2)
+            start = self.unpack(">H", starts + segment * 2)
+            delta = self.unpack(">H", deltas + segment * 2)
+            range_offset_position = range_offsets + segment * 2
+            range_offset = self.unpack(">H", range_offset_position)
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    glyph = self.unpack(
+                        ">H",
+                        range_offset_position
+                        + range_offset
+                        + (code - start) * 2,
+                    )
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                else:
+                    glyph = (code + delta) & 0xFFFF
+                if glyph:
+                    glyphs[chr(code)] = glyph
+        return glyphs
+
+    def width(self, glyph):
+        return self.widths[min(glyph, len(self.widths) - 1)]
+
+    def get_glyph_offsets(self):
+        """Смещения глифов в таблице glyf (таблица loca)."""
+        glyphs_count = self.unpack(">H", self.tables["maxp"] + 4)
+        loca = self.tables["loca"]
+        if self.unpack(">h", self.tables["head"] + 50):
+            return struct.unpack_from(
+                f">{glyphs_count + 1}I", self.data, loca
+            )
+        return [
+            offset * 2
+            for offset in struct.unpack_from(
+                f">{glyphs_count + 1}H", self.data, loca
+            )
+        ]
+
+    def get_components(self, glyph_data):
+        """Номера глифов, из которых состоит составной глиф."""
+        if len(glyph_data) < 10 or struct.unpack_from(
+            ">h", glyph_data
+        )[0] >= 0:
+            return []
+        components = []
+        position = 10
+        flags = MORE_COMPONENTS
+        while flags & MORE_COMPONENTS:
+            flags, glyph = struct.unpack_from(">HH", glyph_data, position)
+            components.append(glyph)
+            position += 4
+            position += 4 if flags & ARG_1_AND_2_ARE_WORDS else 2
+            if flags & WE_HAVE_A_SCALE:
+                position += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                position += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                position += 8
+        return components
+
+    def subset(self, glyphs):
+        """
+        Файл шрифта, в котором оставлены только глифы glyphs.
+
+        Номера глифов не меняются: контуры остальных удаляются, поэтому
+        таблица ссылок на глифы и метрики сохраняют прежний размер,
+        но почти целиком состоят из повторов и хорошо сжимаются.
+        """
+        offsets = self.get_glyph_offsets()
+        glyf = self.tables["glyf"]
+        # Глиф 0 (.notdef) обязателен, составные глифы тянут компоненты
+        pending = {0, *glyphs}
+        kept = {}
+        while pending:
+            glyph = pending.pop()
+            if glyph in kept or glyph + 1 >= len(offsets):
+                continue
+            data = self.data[
+                glyf + offsets[glyph]:glyf + offsets[glyph + 1]
+            ]
+            kept[glyph] = data
+            pending.update(self.get_components(data))
+        glyf_data = []
+        loca = [0]
+        size = 0
+        for glyph in range(len(offsets) - 1):
+            data = kept.get(glyph, b"")
+            data += b"\0" * (-len(data) % 4)
+            glyf_data.append(data)
+            size += len(data)
+            loca.append(size)
+        head = bytearray(self.get_table("head"))
+        # checkSumAdjustment считается при сборке, ссылки на глифы длинные
+        struct.pack_into(">I", head, 8, 0)
+        struct.pack_into(">h", head, 50, 1)
+        tables = {
+            tag: self.get_table(tag)
+            for tag in SUBSET_TABLES
+            if tag in self.tables
+        }
+        tables.update({
+            "head": bytes(head),
+            "glyf": b"".join(glyf_data),
+            "loca": struct.pack(f">{len(loca)}I", *loca),
+        })
+        return build_font_file(tables)
+
+
+def get_checksum(data):
+    data += b"\0" * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def build_font_file(tables):
+    """
+    Собираем файл TrueType из таблиц по тегам.
+
+    В таблице head поле checkSumAdjustment должно быть нулевым,
+    оно заполняется по контрольной сумме всего файла.
+    """
+    tags = sorted(tables)
+    entry_selector = len(tags).bit_length() - 1
+    search_range = 16 << entry_selector
+    header = struct.pack(
+        ">IHHHH",
+        0x00010000,
+        len(tags),
+        search_range,
+        entry_selector,
+        len(tags) * 16 - search_range,
+    )
+    directory = []
+    body = []
+    offset = len(header) + len(tags) * 16
+    head_offset = None
+    for tag in tags:
+        data = tables[tag]
+        if tag == "head":
+            head_offset = offset
+        directory.append(struct.pack(
+            ">4sIII", tag.encode("latin-1"), get_checksum(data), offset,
+            len(data),
+        ))
+        data += b"\0" * (-len(data) % 4)
+        body.append(data)
+        offset += len(data)
+    font = bytearray(header + b"".join(directory) + b"".join(body))
+    if head_offset is not None:
+        struct.pack_into(
+            ">I", font, head_offset + 8,
+            (0xB1B0AFBA - get_checksum(bytes(font))) & 0xFFFFFFFF,
+        )
+    return bytes(font)
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    return TrueTypeFont(path)
+
+
+class StreamingPdfWriter:
+    """
+    Постраничная запись текста в PDF.
+
+    Каждая страница выдаётся сразу после заполнения, а шрифт,
+    дерево страниц и таблица ссылок дописываются в конце файла,
+    поэтому в памяти одновременно находится только одна страница.
+    """
+
+    page_width = 595
+    page_height = 842
+    margin = 50
+    font_size = 12
+    leading = 18
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+    FONT_ID = 3
+    CID_FONT_ID = 4
+    DESCRIPTOR_ID = 5
+    FONT_FILE_ID = 6
+    TO_UNICODE_ID = 7
+    FIRST_PAGE_ID = 8
+
+    def __init__(self, font):
+        self.font = font
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = self.FIRST_PAGE_ID
+        # Использованные глифы и соответствующие им символы
+        self.used_glyphs = {}
+
+    @property
+    def lines_per_page(self):
+        return (self.page_height - 2 * self.margin) // self.leading
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def write_object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        return self.write(
+            f"{object_id} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+        )
+
+    def write_stream(self, object_id, content, extra=""):
+        compressed = zlib.compress(content)
+        return self.write_object(
+            object_id,
+            f"<< /Length {len(compressed)} /Filter /FlateDecode{extra} >>\n"
+            "stream\n".encode("latin-1")
+            + compressed
+            + b"\nendstream",
+        )
+
+    def encode_text(self, text):
+        """Переводим строку в шестнадцатеричные номера глифов."""
+        glyphs = []
+        for char in text:
+            glyph = self.font.glyphs.get(char, 0)
+            if glyph:
+                self.used_glyphs.setdefault(glyph, char)
+            glyphs.append(f"{glyph:04X}")
+        return "<" + "".join(glyphs) + ">"
+
+    def render(self, lines):
+        """Генератор частей PDF-документа для переданных строк."""
+        yield self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        page = []
+        for line in lines:
+            page.append(line)
+            if len(page) == self.lines_per_page:
+                yield self.render_page(page)
+                page = []
+        if page or not self.page_ids:
+            yield self.render_page(page)
+        yield self.render_document_end()
+
+    def render_page(self, lines):
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        top = self.page_height - self.margin - self.font_size
+        content = [
+            "BT",
+            f"/F1 {self.font_size} Tf",
+            f"{self.leading} TL",
+            f"{self.margin} {top} Td",
+        ]
+        for line in lines:
+            content.append(f"{self.encode_text(line)} Tj T*")
+        content.append("ET")
+        return self.write_stream(
+            content_id, "\n".join(content).encode("latin-1")
+        ) + self.write_object(
+            page_id,
+            (
+                f"<< /Type /Page /Parent {self.PAGES_ID} 0 R "
+                f"/MediaBox [0 0 {self.page_width} {self.page_height}] "
+                f"/Resources << /Font << /F1 {self.FONT_ID} 0 R >> >> "
+                f"/Contents {content_id} 0 R >>"
+            ).encode("latin-1"),
+        )
+
+    def render_to_unicode(self):
+        entries = [
+            f"<{glyph:04X}> <{ord(char):04X}>"
+            for glyph, char in sorted(self.used_glyphs.items())
+        ]
+        blocks = []
+        for start in range(0, len(entries), 100):
+            block = entries[start:start + 100]
+            blocks.append(f"{len(block)} beginbfchar")
+            blocks.extend(block)
+            blocks.append("endbfchar")
+        return "\n".join([
+            "/CIDInit /ProcSet findresource begin",
+            "12 dict begin",
+            "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) "
+            "/Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def",
+            "/CMapType 2 def",
+            "1 begincodespacerange",
+            "<0000> <FFFF>",
+            "endcodespacerange",
+            *blocks,
+            "endcmap",
+            "CMapName currentdict /CMap defineresource pop",
+            "end",
+            "end",
+        ]).encode("latin-1")
+
+    def get_font_name(self):
+        """Имя подмножества шрифта: шесть букв, «+» и имя шрифта."""
+        digest = md5(
+            ",".join(map(str, sorted(self.used_glyphs))).encode("latin-1")
+        ).digest()
+        tag = "".join(chr(ord("A") + byte % 26) for byte in digest[:6])
+        return f"{tag}+{self.font.name}"
+
+    def render_fonts(self):
+        font = self.font
+        font_name = self.get_font_name()
+        font_file = font.subset(self.used_glyphs)
+        widths = " ".join(
+            f"{glyph} [{font.width(glyph)}]"
+            for glyph in sorted(self.used_glyphs)
+        )
+        bbox = " ".join(str(value) for value in font.bbox)
+        return b"".join([
+            self.write_object(self.FONT_ID, (
+                f"<< /Type /Font /Subtype /Type0 /BaseFont /{font_name} "
+                "/Encoding /Identity-H "
+                f"/DescendantFonts [{self.CID_FONT_ID} 0 R] "
+                f"/ToUnicode {self.TO_UNICODE_ID} 0 R >>"
+            ).encode("latin-1")),
+            self.write_object(self.CID_FONT_ID, (
+                "<< /Type /Font /Subtype /CIDFontType2 "
+                f"/BaseFont /{font_name} "
+                "/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) "
+                "/Supplement 0 >> "
+                f"/FontDescriptor {self.DESCRIPTOR_ID} 0 R "
+                f"/CIDToGIDMap /Identity /DW 1000 /W [{widths}] >>"
+            ).encode("latin-1")),
+            self.write_object(self.DESCRIPTOR_ID, (
+                f"<< /Type /FontDescriptor /FontName /{font_name} "
+                f"/Flags 32 /FontBBox [{bbox}] /ItalicAngle 0 "
+                f"/Ascent {font.ascent} /Descent {font.descent} "
+                f"/CapHeight {font.ascent} /StemV 80 "
+                f"/FontFile2 {self.FONT_FILE_ID} 0 R >>"
+            ).encode("latin-1")),
+            self.write_stream(
+                self.FONT_FILE_ID, font_file, f" /Length1 {len(font_file)}"
+            ),
+            self.write_stream(self.TO_UNICODE_ID, self.render_to_unicode()),
+        ])
+
+    def render_document_end(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        body = b"".join([
+            self.render_fonts(),
+            self.write_object(self.PAGES_ID, (
+                f"<< /Type /Pages /Kids [{kids}] "
+                f"/Count {len(self.page_ids)} >>"
+            ).encode("latin-1")),
+            self.write_object(self.CATALOG_ID, (
+                f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>"
+            ).encode("latin-1")),
+        ])
+        xref_position = self.position
+        size = self.next_id
+        xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        xref.extend(
+            f"{self.offsets[object_id]:010d} 00000 n \n"
+            for object_id in range(1, size)
+        )
+        xref.append(
+            f"trailer\n<< /Size {size} /Root {self.CATALOG_ID} 0 R >>\n"
+            f"startxref\n{xref_position}\n%%EOF\n"
+        )
+        return body + self.write("".join(xref).encode("latin-1"))
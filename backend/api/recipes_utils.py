@@ -1,17 +1,25 @@
-from io import BytesIO
+import csv
+from collections import defaultdict
 
-from django.http import FileResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.response import Response
 
-from recipes.models import Recipe
+from api.pdf import StreamingPdfWriter, load_font
+from recipes.models import Recipe, RecipeIngredient
 
 
+@transaction.atomic
 def add_recipe_to_list(request, serializer, pk):
     """
     Базовая функция для добавления или удаления рецепта
     из избранного или списка покупок.
+
+    Счётчик рецепта обновляется сигналом в той же транзакции.
     """
     data = {"user": request.user.id, "recipe": pk}
     serializer = serializer(data=data, context={"request": request})
@@ -20,6 +28,7 @@ def add_recipe_to_list(request, serializer, pk):
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@transaction.atomic
 def delete_recipe_from_list(request, pk, model):
     """Удаляем рецепт из списка."""
     recipe = get_object_or_404(Recipe, pk=pk)
@@ -35,23 +44,124 @@ def delete_recipe_from_list(request, pk, model):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def create_file_for_shopping_cart(ingredients):
-    """Создание и отправка файла со списком ингредиентов."""
-    # Создаем файл
-    virtual_file = BytesIO()
+class Echo:
+    """Буфер, который сразу возвращает записанное значение."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_lines(ingredients):
     for item in ingredients:
-        virtual_file.write(
+        yield (
             f'{item["ingredient__name"]} – '
             f'{item["amount"]} '
-            f'{item["ingredient__measurement_unit"]}\n'.encode("utf-8")
+            f'{item["ingredient__measurement_unit"]}'
         )
-    virtual_file.seek(0)
-
-    # Отправляем файл пользователю
-    response = FileResponse(
-        virtual_file,
-        as_attachment=True,
-        filename="Shopping List.txt",
-        content_type="text/plain",
+
+
+def render_shopping_cart_txt(ingredients):
+    for line in shopping_cart_lines(ingredients):
+        yield f"{line}\n".encode("utf-8")
+
+
+def render_shopping_cart_csv(ingredients):
+    writer = csv.writer(Echo())
+    # BOM нужен, чтобы Excel распознал кодировку
+    yield "\ufeff".encode("utf-8")
+    yield writer.writerow(
+        ("Ингредиент", "Количество", "Единица измерения")
+    ).encode("utf-8")
+    for item in ingredients:
+        yield writer.writerow((
+            item["ingredient__name"],
+            item["amount"],
+            item["ingredient__measurement_unit"],
+        )).encode("utf-8")
+
+
+def render_shopping_cart_pdf(ingredients):
+    writer = StreamingPdfWriter(load_font(settings.SHOPPING_LIST_PDF_FONT))
+    return writer.render(shopping_cart_lines(ingredients))
+
+
+SHOPPING_CART_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", render_shopping_cart_txt),
+    "csv": ("text/csv; charset=utf-8", render_shopping_cart_csv),
+    "pdf": ("application/pdf", render_shopping_cart_pdf),
+}
+
+
+def get_shopping_cart_ingredients(user_id):
+    """Суммируем ингредиенты рецептов из списка покупок пользователя."""
+    return RecipeIngredient.objects.filter(
+        recipe__usershoppinglist__user_id=user_id
+    ).values(
+        "ingredient__name", "ingredient__measurement_unit"
+    ).annotate(
+        amount=Sum("amount")
+    ).order_by("ingredient__name")
+
+
+def get_shopping_cart_format_error():
+    return Response(
+        {"errors": "Доступные форматы: " + ", ".join(SHOPPING_CART_FORMATS)},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+def create_file_for_shopping_cart(ingredients, file_format="txt"):
+    """
+    Потоковая отправка файла со списком ингредиентов.
+
+    Строки читаются из БД серверным курсором и сразу отдаются клиенту,
+    поэтому расход памяти не зависит от размера списка покупок.
+    """
+    if file_format not in SHOPPING_CART_FORMATS:
+        return get_shopping_cart_format_error()
+    content_type, render = SHOPPING_CART_FORMATS[file_format]
+    response = StreamingHttpResponse(
+        render(
+            ingredients.iterator(
+                chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE
+            )
+        ),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="Shopping List.{file_format}"'
     )
     return response
+
+
+def get_recipes_limit(request):
+    """Получаем и проверяем ограничение на количество рецептов автора."""
+    recipes_limit = request.query_params.get("recipes_limit")
+    if not recipes_limit:
+        return None
+    try:
+        recipes_limit = int(recipes_limit)
+    except ValueError:
+        raise serializers.ValidationError(
+            "Значение recipes_limit не является числом"
+        )
+    if recipes_limit < 1:
+        raise serializers.ValidationError(
+            "Значение recipes_limit должно быть > 0"
+        )
+    return recipes_limit
+
+
+def attach_author_recipes(authors, recipes_limit=None):
+    """
+    Загружаем последние рецепты авторов одним запросом
+    и сохраняем их в атрибут limited_recipes каждого автора.
+    """
+    recipes_by_author = defaultdict(list)
+    recipes = Recipe.objects.for_card("author_id", "created_at")
+    for recipe in recipes.limited_per_author(
+        [author.id for author in authors], recipes_limit
+    ):
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.limited_recipes = recipes_by_author[author.id]
@@ -1,22 +1,187 @@
+from collections.abc import Mapping
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.fields import SkipField
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.validators import UniqueTogetherValidator
 
-# from api.recipes_utils import add_ingredients_to_recipeingredient
+from api.cache import RECIPES_VERSION_KEY, bump_cache_version
+from api.recipes_utils import attach_author_recipes
+from jobs.models import Job
 from recipes.models import (Ingredient, Recipe, RecipeIngredient, Tag,
                             UserFavorite, UserShoppingList)
+from recipes.renditions import RENDITIONS, get_rendition_url
+from recipes.tasks import make_renditions_later
 from users.models import UserSubscriptions
 
 User = get_user_model()
 
 
+class ImageRenditionField(serializers.Field):
+    """
+    Ссылка на вариант изображения.
+
+    Пока вариант не создан, возвращается ссылка на оригинал.
+    """
+
+    def __init__(self, image_field, rendition, **kwargs):
+        self.image_field = image_field
+        self.rendition = rendition
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_url(self, instance, rendition):
+        url = get_rendition_url(instance, self.image_field, rendition)
+        request = self.context.get("request")
+        if url is not None and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, instance):
+        return self.get_url(instance, self.rendition)
+
+
+class ImageRenditionsField(ImageRenditionField):
+    """Ссылки на все варианты изображения."""
+
+    def __init__(self, image_field, **kwargs):
+        super().__init__(image_field, None, **kwargs)
+
+    def to_representation(self, instance):
+        return {
+            rendition.name: self.get_url(instance, rendition.name)
+            for rendition in RENDITIONS[self.image_field]
+        }
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Первичный ключ объекта из списка.
+
+    Поле проверяет только тип ключа, а объекты по ключам всего списка
+    загружаются одним запросом в BulkManyRelatedField (many=True)
+    или в BulkRelatedListSerializer (вложенный сериализатор).
+    """
+
+    def to_internal_value(self, data):
+        # to_python(True) вернул бы 1, а PrimaryKeyRelatedField
+        # отклоняет логические значения
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except ValidationError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def get_objects(self, pks):
+        """Загружаем объекты по списку ключей одним запросом."""
+        return self.get_queryset().in_bulk(set(pks))
+
+    def get_does_not_exist_error(self, pk):
+        return self.error_messages["does_not_exist"].format(pk_value=pk)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, объекты по которым загружаются разом."""
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = self.child_relation.get_objects(pks)
+        for pk in pks:
+            if pk not in objects:
+                raise serializers.ValidationError(
+                    self.child_relation.get_does_not_exist_error(pk),
+                    code="does_not_exist",
+                )
+        return [objects[pk] for pk in pks]
+
+
+class BulkRelatedListSerializer(serializers.ListSerializer):
+    """
+    Список вложенных объектов с полями BulkPrimaryKeyRelatedField.
+
+    Связанные объекты загружаются одним запросом на поле,
+    ошибки возвращаются в том же виде, что и у ListSerializer.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            items = super().to_internal_value(data)
+        except serializers.ValidationError as exc:
+            if not isinstance(exc.detail, list):
+                raise
+            # Дополняем ошибки элементов ошибками несуществующих ключей
+            self.load_objects(data, exc.detail, validated=False)
+            raise
+        errors = [{} for _ in items]
+        self.load_objects(items, errors, validated=True)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    @staticmethod
+    def get_pk(field, item, validated):
+        """Ключ из проверенного элемента или из исходных данных."""
+        if validated:
+            return item.get(field.source)
+        if not isinstance(item, Mapping):
+            return None
+        try:
+            return field.run_validation(field.get_value(item))
+        except (serializers.ValidationError, SkipField):
+            return None
+
+    def load_objects(self, items, errors, validated):
+        """
+        Загружаем объекты полей BulkPrimaryKeyRelatedField.
+
+        В проверенные элементы подставляются объекты, а в errors
+        записываются ошибки несуществующих ключей.
+        """
+        for field_name, field in self.child.fields.items():
+            if (
+                not isinstance(field, BulkPrimaryKeyRelatedField)
+                or field.read_only
+            ):
+                continue
+            pks = [
+                None if field_name in item_errors
+                else self.get_pk(field, item, validated)
+                for item, item_errors in zip(items, errors)
+            ]
+            objects = field.get_objects(pk for pk in pks if pk is not None)
+            for item, pk, item_errors in zip(items, pks, errors):
+                if pk is None:
+                    continue
+                if pk not in objects:
+                    item_errors[field_name] = [ErrorDetail(
+                        field.get_does_not_exist_error(pk),
+                        code="does_not_exist",
+                    )]
+                elif validated:
+                    item[field.source] = objects[pk]
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для пользователей."""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar_thumb = ImageRenditionField("avatar", "thumb")
 
     class Meta:
         model = User
@@ -27,6 +192,7 @@ class UserSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "avatar",
+            "avatar_thumb",
             "is_subscribed",
         )
 
@@ -35,6 +201,10 @@ class UserSerializer(serializers.ModelSerializer):
         Проверяем, подписан ли текущий пользователь
         на сериализуемого пользователя
         """
+        # Используем аннотацию из queryset, если она есть
+        is_subscribed = getattr(obj, "is_subscribed", None)
+        if is_subscribed is not None:
+            return is_subscribed
         request = self.context.get("request")
         return (
             request
@@ -49,10 +219,11 @@ class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для аватаров."""
 
     avatar = Base64ImageField(required=True)
+    avatar_thumb = ImageRenditionField("avatar", "thumb")
 
     class Meta:
         model = User
-        fields = ("avatar",)
+        fields = ("avatar", "avatar_thumb")
 
     def validate_avatar(self, value):
         """Проверяем, что передано не пустое поле."""
@@ -60,6 +231,11 @@ class AvatarSerializer(serializers.ModelSerializer):
             raise ValidationError("Передано пустое поле avatar")
         return value
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        make_renditions_later(instance, "avatar")
+        return instance
+
 
 class IngredientSerialiser(serializers.ModelSerializer):
     """Сериализатор для ингридиентов."""
@@ -98,6 +274,8 @@ class RecipeGetSerialiser(serializers.ModelSerializer):
     """Сериализатор для получения рецептов."""
 
     image = Base64ImageField()
+    image_thumb = ImageRenditionField("image", "thumb")
+    image_renditions = ImageRenditionsField("image")
     author = UserSerializer()
     tags = TagSerialiser(many=True)
     ingredients = RecipeIngredientGetSerializer(
@@ -116,14 +294,26 @@ class RecipeGetSerialiser(serializers.ModelSerializer):
             "ingredients",
             "name",
             "image",
+            "image_thumb",
+            "image_renditions",
             "text",
             "cooking_time",
             "is_favorited",
             "is_in_shopping_cart",
         )
 
+    def to_representation(self, instance):
+        # Передаем аннотацию подписки на автора во вложенный сериализатор
+        author_is_subscribed = getattr(instance, "author_is_subscribed", None)
+        if author_is_subscribed is not None:
+            instance.author.is_subscribed = author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
         """Проверяем, есть ли рецепт в избранном пользователя."""
+        is_favorited = getattr(obj, "is_favorited", None)
+        if is_favorited is not None:
+            return is_favorited
         request = self.context.get("request")
         return (
             request
@@ -135,6 +325,9 @@ class RecipeGetSerialiser(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяем, есть ли рецепт в списке покупок пользователя."""
+        is_in_shopping_cart = getattr(obj, "is_in_shopping_cart", None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         request = self.context.get("request")
         return (
             request
@@ -149,10 +342,11 @@ class RecipeFavoriteGetSerialiser(serializers.ModelSerializer):
     """Сериализатор для получения рецептов при добавлении в избранное."""
 
     image = Base64ImageField()
+    image_thumb = ImageRenditionField("image", "thumb")
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_thumb", "cooking_time")
 
 
 class RecipeIngredientPostSerialiser(serializers.ModelSerializer):
@@ -161,13 +355,12 @@ class RecipeIngredientPostSerialiser(serializers.ModelSerializer):
     в промежуточную модель RecipeIngredient.
     """
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-    )
+    id = BulkPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = RecipeIngredient
         fields = ("amount", "id")
+        list_serializer_class = BulkRelatedListSerializer
 
 
 class RecipePostSerialiser(serializers.ModelSerializer):
@@ -178,7 +371,7 @@ class RecipePostSerialiser(serializers.ModelSerializer):
         many=True,
         source="recipeingredient"
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
@@ -259,6 +452,18 @@ class RecipePostSerialiser(serializers.ModelSerializer):
             ]
         )
 
+    @staticmethod
+    def recipes_changed():
+        """
+        Сбрасываем кэш рецептов после фиксации транзакции.
+
+        Теги и ингредиенты записываются через bulk_create, bulk_update
+        и QuerySet.delete, которые не отправляют m2m_changed.
+        """
+        transaction.on_commit(
+            lambda: bump_cache_version(RECIPES_VERSION_KEY)
+        )
+
     @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("recipeingredient")
@@ -273,25 +478,86 @@ class RecipePostSerialiser(serializers.ModelSerializer):
             recipe=recipe,
             ingredients=ingredients
         )
+        self.recipes_changed()
+        make_renditions_later(recipe, "image")
         return recipe
 
-    def update(self, instance, validated_data):
-        new_tags = validated_data.pop("tags")
-        new_ingredients = validated_data.pop("recipeingredient")
+    @staticmethod
+    def update_tags(recipe, tags):
+        """
+        Приводим теги рецепта к переданному списку.
 
-        # Перезаписываем теги
-        instance.tags.clear()
-        instance.tags.set(new_tags)
+        Удаляются только снятые теги и добавляются только новые.
+        """
+        current_ids = set(
+            recipe.recipetag.values_list("tag_id", flat=True)
+        )
+        new_ids = {tag.id for tag in tags}
+        removed_ids = current_ids - new_ids
+        if removed_ids:
+            # Удаляем через модель связи, чтобы сработали сигналы маски тегов
+            recipe.recipetag.filter(tag_id__in=removed_ids).delete()
+        added = [tag for tag in tags if tag.id not in current_ids]
+        if added:
+            recipe.tags.add(*added)
 
-        # Перезаписывам ингредиенты
-        instance.ingredients.clear()
-        self.add_ingredients_to_recipeingredient(
-            recipe=instance,
-            ingredients=new_ingredients
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """
+        Приводим ингредиенты рецепта к переданному списку.
+
+        Удаляются убранные ингредиенты, количество обновляется только
+        у изменившихся, новые добавляются одним запросом.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipeingredient.all()
+        }
+        new_amounts = {
+            ingredient["id"].id: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        removed_ids = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        changed = []
+        created = []
+        for ingredient_id, amount in new_amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is None:
+                created.append(RecipeIngredient(
+                    ingredient_id=ingredient_id, amount=amount, recipe=recipe
+                ))
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if removed_ids:
+            RecipeIngredient.objects.filter(id__in=removed_ids).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        self.update_tags(instance, validated_data.pop("tags"))
+        self.update_ingredients(
+            instance, validated_data.pop("recipeingredient")
         )
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        self.recipes_changed()
+        if "image" in validated_data:
+            make_renditions_later(instance, "image")
+        return instance
 
     def to_representation(self, instance):
+        # Перечитываем рецепт с тегами, ингредиентами и флагами
+        # пользователя фиксированным числом запросов
+        instance = Recipe.objects.with_related().with_user_flags(
+            self.context["request"].user
+        ).get(pk=instance.pk)
         return RecipeGetSerialiser(instance, context=self.context).data
 
 
@@ -301,9 +567,11 @@ class SubscriptionsRecipeSerializer(serializers.ModelSerializer):
     на которого текущий пользователь подписался.
     """
 
+    image_thumb = ImageRenditionField("image", "thumb")
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_thumb", "cooking_time")
 
 
 class SubscriptionsPostSerializer(UserSerializer):
@@ -317,7 +585,7 @@ class SubscriptionsSerializer(UserSerializer):
     """
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -335,31 +603,16 @@ class SubscriptionsSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         """Получаем рецепты пользователя."""
-        # Получаем ограничение на количество рецептов из запроса
-        recipes_limit = self.context.get("request").query_params.get(
-            "recipes_limit", None
-        )
-        recipes = obj.author_recipes.all()
-        # Получаем нужное количество рецептов
-        if recipes_limit:
-            try:
-                recipes_limit = int(recipes_limit)
-                if recipes_limit < 1:
-                    raise serializers.ValidationError(
-                        "Значение recipes_limit должно быть > 0"
-                    )
+        recipes = getattr(obj, "limited_recipes", None)
+        if recipes is None:
+            recipes = obj.author_recipes.all()
+            # Ограничение на количество рецептов проверяется в представлении
+            recipes_limit = self.context.get("recipes_limit")
+            if recipes_limit:
                 recipes = recipes[:recipes_limit]
-            except ValueError:
-                raise serializers.ValidationError(
-                    "Значение recipes_limit не является числом"
-                )
         serializer = SubscriptionsRecipeSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        """Получаем количество рецептов пользователя."""
-        return obj.author_recipes.count()
-
 
 class UserSubscriptionSerializer(serializers.ModelSerializer):
     """Сериализатор для подписки на пользователя."""
@@ -382,8 +635,14 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
     def to_representation(self, instance):
+        subscription = User.objects.get(pk=instance.subscription_id)
+        # Подписка только что создана
+        subscription.is_subscribed = True
+        attach_author_recipes(
+            [subscription], self.context.get("recipes_limit")
+        )
         return SubscriptionsSerializer(
-            instance.subscription,
+            subscription,
             context=self.context
         ).data
 
@@ -391,6 +650,10 @@ class UserSubscriptionSerializer(serializers.ModelSerializer):
 class RecipeToFavoriteSerializer(serializers.ModelSerializer):
     """Сериализатор для добавление рецептов в избранное."""
 
+    recipe = serializers.PrimaryKeyRelatedField(
+        queryset=Recipe.objects.for_card()
+    )
+
     class Meta:
         model = UserFavorite
         fields = "__all__"
@@ -407,6 +670,10 @@ class RecipeToFavoriteSerializer(serializers.ModelSerializer):
 class RecipeToShoppingListSerializer(serializers.ModelSerializer):
     """Сериализатор для добавление рецептов в список покупок."""
 
+    recipe = serializers.PrimaryKeyRelatedField(
+        queryset=Recipe.objects.for_card()
+    )
+
     class Meta:
         model = UserShoppingList
         fields = "__all__"
@@ -419,3 +686,26 @@ class RecipeToShoppingListSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return RecipeFavoriteGetSerialiser(instance.recipe).data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор для состояния фоновой задачи."""
+
+    class Meta:
+        model = Job
+        fields = (
+            "id", "name", "status", "attempts", "created_at",
+            "finished_at", "result",
+        )
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        result = data["result"]
+        if isinstance(result, dict) and result.get("file"):
+            # Отдаём ссылку на файл вместо пути в хранилище
+            url = default_storage.url(result["file"])
+            request = self.context.get("request")
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            data["result"] = {**result, "file": url}
+        return data
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_auth_user
+from api.cache import (CATALOG_VERSION_KEY, RECIPES_VERSION_KEY,
+                       bump_cache_version, bump_user_lists_version)
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag, UserFavorite, UserShoppingList)
+from users.models import UserSubscriptions
+
+User = get_user_model()
+
+# Поля пользователя, которые выводятся в карточке автора рецепта
+AUTHOR_FIELDS = frozenset(
+    ("email", "username", "first_name", "last_name", "avatar")
+)
+
+
+def recipes_changed(sender, **kwargs):
+    """Сбрасываем кэш рецептов при изменении данных, входящих в выдачу."""
+    bump_cache_version(RECIPES_VERSION_KEY)
+
+
+def author_changed(sender, update_fields=None, **kwargs):
+    """
+    Сбрасываем кэш рецептов только при изменении полей автора.
+
+    Вход (last_login) и служебные поля на выдачу не влияют.
+    """
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump_cache_version(RECIPES_VERSION_KEY)
+
+
+def catalog_changed(sender, **kwargs):
+    """Сбрасываем кэш справочников тегов и ингредиентов."""
+    bump_cache_version(CATALOG_VERSION_KEY)
+
+
+def user_lists_changed(sender, instance, **kwargs):
+    """Сбрасываем кэш списков пользователя при их изменении."""
+    bump_user_lists_version(instance.user_id)
+
+
+for model in (Recipe, RecipeTag, RecipeIngredient, Tag, User):
+    post_delete.connect(recipes_changed, sender=model)
+
+for model in (Recipe, RecipeTag, RecipeIngredient, Tag):
+    post_save.connect(recipes_changed, sender=model)
+post_save.connect(author_changed, sender=User)
+
+# Изменения связей через recipe.tags.set() и add(). Массовые записи
+# тегов и ингредиентов в RecipePostSerialiser сбрасывают кэш сами.
+for through in (Recipe.tags.through, Recipe.ingredients.through):
+    m2m_changed.connect(recipes_changed, sender=through)
+
+for model in (Ingredient, Tag):
+    post_save.connect(catalog_changed, sender=model)
+    post_delete.connect(catalog_changed, sender=model)
+
+for model in (UserFavorite, UserShoppingList, UserSubscriptions):
+    post_save.connect(user_lists_changed, sender=model)
+    post_delete.connect(user_lists_changed, sender=model)
+
+
+def auth_user_changed(sender, instance, **kwargs):
+    """
+    Сбрасываем кэш аутентификации пользователя при выходе,
+    смене пароля, деактивации или удалении.
+    """
+    invalidate_auth_user(instance.pk)
+
+
+def auth_token_deleted(sender, instance, **kwargs):
+    invalidate_auth_user(instance.user_id)
+
+
+post_save.connect(auth_user_changed, sender=User)
+post_delete.connect(auth_user_changed, sender=User)
+post_delete.connect(auth_token_deleted, sender=Token)
@@ -0,0 +1,45 @@
+import os
+from tempfile import TemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from api.recipes_utils import (SHOPPING_CART_FORMATS,
+                               get_shopping_cart_ingredients)
+from jobs.queue import task
+
+EXPORTS_DIRECTORY = "exports"
+
+
+def delete_export_file(result):
+    if result.get("file"):
+        default_storage.delete(result["file"])
+
+
+@task(
+    "api.export_shopping_cart", timeout=600, on_purge=delete_export_file
+)
+def export_shopping_cart(user_id, file_format):
+    """
+    Сохраняем список покупок в файл в хранилище медиафайлов.
+
+    Файл пишется во временный файл по частям, поэтому расход
+    памяти не зависит от размера списка.
+    """
+    _, render = SHOPPING_CART_FORMATS[file_format]
+    ingredients = get_shopping_cart_ingredients(user_id).iterator(
+        chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE
+    )
+    with TemporaryFile() as output:
+        for chunk in render(ingredients):
+            output.write(chunk)
+        output.seek(0)
+        name = default_storage.save(
+            os.path.join(
+                EXPORTS_DIRECTORY, f"shopping_list_{uuid4().hex}.{file_format}"
+            ),
+            File(output),
+        )
+    return {"file": name}
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.http import http_date, parse_http_date
+from rest_framework.test import APIClient
+
+from api.views import TagViewSet
+from recipes.models import Tag
+
+
+class CatalogConditionalGetTest(TestCase):
+    """Условные запросы к справочникам."""
+
+    def setUp(self):
+        cache.clear()
+        TagViewSet.catalog = None
+        Tag.objects.create(name="Завтрак", slug="breakfast")
+        self.client = APIClient()
+
+    def get_tags(self, **headers):
+        return self.client.get("/api/tags/", **headers)
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.get_tags()["ETag"]
+        self.assertEqual(self.get_tags(HTTP_IF_NONE_MATCH=etag).status_code,
+                         304)
+
+    def test_if_modified_since_is_honored(self):
+        last_modified = self.get_tags()["Last-Modified"]
+        self.assertEqual(
+            self.get_tags(HTTP_IF_MODIFIED_SINCE=last_modified).status_code,
+            304,
+        )
+        earlier = http_date(parse_http_date(last_modified) - 1)
+        self.assertEqual(
+            self.get_tags(HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200
+        )
+
+    def test_if_none_match_takes_precedence(self):
+        last_modified = self.get_tags()["Last-Modified"]
+        response = self.get_tags(
+            HTTP_IF_NONE_MATCH='"stale"',
+            HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_updates_etag(self):
+        etag = self.get_tags()["ETag"]
+        Tag.objects.create(name="Обед", slug="lunch")
+        response = self.get_tags(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.filters import IngredientSearchIndex
+from api.views import IngredientViewSet
+from recipes.models import Ingredient
+
+NAMES = (
+    "соль",
+    "соль морская",
+    "морская капуста",
+    "фасоль белая",
+    "сахар",
+)
+
+
+def get_names(items):
+    return [item["name"] for item in items]
+
+
+class IngredientSearchIndexTest(SimpleTestCase):
+    """Поиск по индексу ингредиентов в памяти."""
+
+    def setUp(self):
+        self.index = IngredientSearchIndex(
+            [{"id": id, "name": name} for id, name in enumerate(NAMES)]
+        )
+
+    def test_prefix_matches_go_first(self):
+        self.assertEqual(
+            get_names(self.index.search("соль")),
+            ["соль", "соль морская", "фасоль белая"],
+        )
+
+    def test_multi_word_query_matches_words_in_any_order(self):
+        self.assertEqual(
+            get_names(self.index.search("морская соль")), ["соль морская"]
+        )
+        self.assertEqual(
+            get_names(self.index.search("Соль  МОРСКАЯ")), ["соль морская"]
+        )
+
+    def test_all_words_are_required(self):
+        self.assertEqual(self.index.search("морская сахар"), [])
+
+    def test_limit(self):
+        self.assertEqual(
+            get_names(self.index.search("соль", limit=2)),
+            ["соль", "соль морская"],
+        )
+
+
+class IngredientSearchApiTest(TestCase):
+    """Поиск ингредиентов через API."""
+
+    def setUp(self):
+        cache.clear()
+        IngredientViewSet.catalog = None
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit="г") for name in NAMES
+        )
+        self.client = APIClient()
+
+    def test_multi_word_query(self):
+        response = self.client.get(
+            "/api/ingredients/", {"name": "морская соль"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_names(response.json()), ["соль морская"])
+
+    def test_queryset_search_matches_catalog(self):
+        request = Request(APIRequestFactory().get(
+            "/api/ingredients/", {"name": "белая фасоль"}
+        ))
+        queryset = IngredientViewSet.filter_backends[0]().filter_queryset(
+            request, Ingredient.objects.all(), None
+        )
+        self.assertEqual(
+            list(queryset.values_list("name", flat=True)), ["фасоль белая"]
+        )
+
+    def test_queryset_ranking_uses_normalized_query(self):
+        request = Request(APIRequestFactory().get(
+            "/api/ingredients/", {"name": "  соль   морская "}
+        ))
+        queryset = IngredientViewSet.filter_backends[0]().filter_queryset(
+            request, Ingredient.objects.all(), None
+        )
+        self.assertEqual(
+            list(queryset.values_list("name", "prefix_rank")),
+            [("соль морская", 0)],
+        )
@@ -0,0 +1,116 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from api.management.commands.check_query_plans import (LARGE_TABLES,
+                                                       check_plan, explain,
+                                                       get_querysets)
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag, UserFavorite, UserShoppingList)
+from users.models import FoodgramUser, UserSubscriptions
+
+AUTHORS_COUNT = 5
+RECIPES_PER_AUTHOR = 100
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "EXPLAIN проверяется в PostgreSQL"
+)
+class QueryPlansTest(TestCase):
+    """
+    Планы запросов горячих путей.
+
+    На небольших тестовых данных планировщику выгоднее читать таблицы
+    целиком и сортировать, поэтому это запрещается настройками сеанса:
+    если план всё равно содержит такой узел, подходящего индекса нет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            FoodgramUser.objects.create_user(
+                username=f"author{number}",
+                email=f"author{number}@example.com",
+                password="Secret-password-1",
+            )
+            for number in range(AUTHORS_COUNT)
+        ]
+        cls.user = authors[0]
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"Тег {number}", slug=f"tag{number}")
+            for number in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {number}", measurement_unit="г")
+            for number in range(20)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+            )
+            for author in authors
+            for number in range(RECIPES_PER_AUTHOR)
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tags[number % len(tags)])
+            for number, recipe in enumerate(recipes)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(number + shift) % len(ingredients)],
+                amount=10,
+            )
+            for number, recipe in enumerate(recipes)
+            for shift in range(3)
+        )
+        UserFavorite.objects.bulk_create(
+            UserFavorite(user=cls.user, recipe=recipe)
+            for recipe in recipes[::7]
+        )
+        UserShoppingList.objects.bulk_create(
+            UserShoppingList(user=cls.user, recipe=recipe)
+            for recipe in recipes[::11]
+        )
+        UserSubscriptions.objects.bulk_create(
+            UserSubscriptions(user=cls.user, subscription=author)
+            for author in authors[1:]
+        )
+        with connection.cursor() as cursor:
+            for table in LARGE_TABLES:
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def test_hot_paths_use_indexes(self):
+        for name, queryset, allow_sort in get_querysets(self.user):
+            with self.subTest(name):
+                self.assertEqual(
+                    check_plan(explain(queryset), allow_sort), []
+                )
+
+    def test_check_plan_reports_problems(self):
+        plan = {
+            "Node Type": "Sort",
+            "Sort Key": ["created_at"],
+            "Plans": [{
+                "Node Type": "Seq Scan",
+                "Relation Name": "recipes_recipe",
+            }],
+        }
+        self.assertEqual(
+            check_plan(plan, allow_sort=False),
+            ["Sort by ['created_at']", "Seq Scan on recipes_recipe"],
+        )
+        self.assertEqual(
+            check_plan(plan, allow_sort=True),
+            ["Seq Scan on recipes_recipe"],
+        )
@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import FoodgramUser
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+INGREDIENTS_COUNT = 20
+
+
+class RecipeUpdateQueriesTest(TestCase):
+    """Запросы на запись при изменении рецепта."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = FoodgramUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Secret-password-1",
+        )
+        self.tags = [
+            Tag.objects.create(name=f"Тег {number}", slug=f"tag{number}")
+            for number in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f"ингредиент {number}", measurement_unit="г"
+            )
+            for number in range(INGREDIENTS_COUNT)
+        ]
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/recipe.png",
+        )
+        self.recipe.tags.add(*self.tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=self.recipe, ingredient=ingredient, amount=10
+            )
+            for ingredient in self.ingredients
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_data(self, **changes):
+        data = {
+            "tags": [tag.id for tag in self.tags],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 10}
+                for ingredient in self.ingredients
+            ],
+            "name": self.recipe.name,
+            "text": self.recipe.text,
+            "cooking_time": self.recipe.cooking_time,
+        }
+        data.update(changes)
+        return data
+
+    def patch_recipe(self, data):
+        """Изменяем рецепт и возвращаем выполненные запросы на запись."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f"/api/recipes/{self.recipe.id}/", data, format="json"
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].lstrip().upper().startswith(WRITE_STATEMENTS)
+        ]
+
+    def assert_writes(self, writes, statement, table, count):
+        self.assertEqual(
+            len([
+                sql for sql in writes
+                if sql.lstrip().upper().startswith(statement)
+                and f'"{table}"' in sql
+            ]),
+            count,
+            writes,
+        )
+
+    def test_name_only_edit(self):
+        writes = self.patch_recipe(self.get_data(name="Новое название"))
+        self.assertEqual(len(writes), 1, writes)
+        self.assert_writes(writes, "UPDATE", "recipes_recipe", 1)
+        for sql in writes:
+            self.assertNotIn("recipes_recipetag", sql)
+            self.assertNotIn("recipes_recipeingredient", sql)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Новое название")
+
+    def test_name_only_edit_cost_does_not_depend_on_size(self):
+        writes = self.patch_recipe(self.get_data(name="Первое"))
+        self.ingredients = self.ingredients[:5]
+        RecipeIngredient.objects.filter(recipe=self.recipe).exclude(
+            ingredient__in=self.ingredients
+        ).delete()
+        self.assertEqual(
+            len(self.patch_recipe(self.get_data(name="Второе"))),
+            len(writes),
+        )
+
+    def test_amount_change_is_one_bulk_update(self):
+        ingredients = self.get_data()["ingredients"]
+        ingredients[0]["amount"] = 25
+        writes = self.patch_recipe(self.get_data(ingredients=ingredients))
+        self.assert_writes(writes, "UPDATE", "recipes_recipeingredient", 1)
+        self.assert_writes(writes, "INSERT", "recipes_recipeingredient", 0)
+        self.assert_writes(writes, "DELETE", "recipes_recipeingredient", 0)
+        self.assertEqual(
+            RecipeIngredient.objects.get(
+                recipe=self.recipe, ingredient=self.ingredients[0]
+            ).amount,
+            25,
+        )
+
+    def test_tag_removal_is_one_delete(self):
+        tags = [tag.id for tag in self.tags[1:]]
+        writes = self.patch_recipe(self.get_data(tags=tags))
+        self.assertEqual(
+            len([
+                sql for sql in writes
+                if sql.lstrip().upper().startswith("DELETE")
+            ]),
+            1,
+            writes,
+        )
+        self.assert_writes(writes, "DELETE", "recipes_recipetag", 1)
+        self.assert_writes(writes, "INSERT", "recipes_recipetag", 0)
+        self.assertEqual(
+            sorted(self.recipe.tags.values_list("id", flat=True)), tags
+        )
@@ -0,0 +1,128 @@
+import base64
+from io import BytesIO
+
+from django.test import TestCase
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from api.serializers import (BulkPrimaryKeyRelatedField,
+                             RecipeIngredientPostSerialiser)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import FoodgramUser
+
+
+def get_png_image():
+    output = BytesIO()
+    Image.new("RGB", (1, 1)).save(output, "PNG")
+    return "data:image/png;base64," + base64.b64encode(
+        output.getvalue()
+    ).decode("ascii")
+
+
+PNG_IMAGE = get_png_image()
+
+
+class BaselineRecipeIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.PrimaryKeyRelatedField(
+        queryset=Ingredient.objects.all()
+    )
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ("amount", "id")
+
+
+class BaselineRecipeSerializer(serializers.Serializer):
+    """Поля рецепта с обычными PrimaryKeyRelatedField."""
+
+    tags = serializers.PrimaryKeyRelatedField(
+        queryset=Tag.objects.all(), many=True
+    )
+    ingredients = BaselineRecipeIngredientSerializer(many=True)
+
+
+class BulkRecipeSerializer(serializers.Serializer):
+    """Те же поля с загрузкой объектов одним запросом."""
+
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
+    ingredients = RecipeIngredientPostSerialiser(many=True)
+
+
+class BulkPrimaryKeyValidationTest(TestCase):
+    """Ошибки ключей совпадают с ошибками PrimaryKeyRelatedField."""
+
+    def setUp(self):
+        self.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        self.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+
+    def assert_same_errors(self, tags, ingredient_ids):
+        data = {
+            "tags": tags,
+            "ingredients": [
+                {"id": ingredient_id, "amount": 1}
+                for ingredient_id in ingredient_ids
+            ],
+        }
+        baseline = BaselineRecipeSerializer(data=data)
+        bulk = BulkRecipeSerializer(data=data)
+        self.assertEqual(bulk.is_valid(), baseline.is_valid())
+        self.assertEqual(bulk.errors, baseline.errors)
+        return bulk.errors
+
+    def test_valid_keys(self):
+        self.assertEqual(
+            self.assert_same_errors([self.tag.id], [self.ingredient.id]), {}
+        )
+
+    def test_missing_keys(self):
+        errors = self.assert_same_errors(
+            [self.tag.id, 999], [self.ingredient.id, 999]
+        )
+        self.assertEqual(errors["tags"][0].code, "does_not_exist")
+        self.assertEqual(errors["ingredients"][1]["id"][0].code,
+                         "does_not_exist")
+
+    def test_wrong_type_keys(self):
+        errors = self.assert_same_errors(["abc"], [{"id": 1}])
+        self.assertEqual(errors["tags"][0].code, "incorrect_type")
+
+    def test_bool_keys(self):
+        errors = self.assert_same_errors([True], [True])
+        self.assertEqual(errors["tags"][0].code, "incorrect_type")
+        self.assertEqual(errors["ingredients"][0]["id"][0].code,
+                         "incorrect_type")
+
+
+class RecipeCreateValidationTest(TestCase):
+    """Проверка ключей при создании рецепта через API."""
+
+    def test_bool_tag_is_rejected(self):
+        user = FoodgramUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Secret-password-1",
+        )
+        Tag.objects.create(name="Завтрак", slug="breakfast")
+        ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            "/api/recipes/",
+            {
+                "tags": [True],
+                "ingredients": [{"id": ingredient.id, "amount": 1}],
+                "name": "Рецепт",
+                "text": "Описание",
+                "cooking_time": 10,
+                "image": PNG_IMAGE,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("bool", response.json()["tags"][0])
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,173 @@
+import time
+import unittest
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections, reset_queries
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_user_cache
+from backend.db.replicas import PIN_COOKIE_NAME
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import FoodgramUser
+
+REPLICAS = settings.DATABASE_REPLICAS
+PIN_SECONDS = 1
+# Токен всегда проверяется по основной базе
+TOKEN_TABLE = '"authtoken_token"'
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql" and REPLICAS,
+    "Нужна реплика PostgreSQL из DB_REPLICAS",
+)
+@override_settings(REPLICA_PIN_SECONDS=PIN_SECONDS)
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Выбор базы для запросов к API.
+
+    В тестах реплика — отдельное соединение с той же базой, поэтому
+    используется TransactionTestCase: данные должны быть видны обоим
+    соединениям. База определяется по соединению, выполнившему запросы.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, *REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        token_user_cache.clear()
+        self.author = FoodgramUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Secret-password-1",
+        )
+        self.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        self.ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/recipe.png",
+        )
+        self.recipe.tags.add(self.tag)
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, amount=10
+        )
+        self.client = self.get_token_client(self.author)
+
+    def get_token_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+        )
+        return client
+
+    def get_aliases(self, client, method, path, data=None):
+        """Выполняем запрос и возвращаем базы, получившие запросы."""
+        reset_queries()
+        with ExitStack() as stack:
+            contexts = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in (DEFAULT_DB_ALIAS, *REPLICAS)
+            }
+            response = getattr(client, method)(path, data, format="json")
+        self.assertLess(response.status_code, 400, response.content)
+        return {
+            alias for alias, context in contexts.items()
+            if any(
+                TOKEN_TABLE not in query["sql"]
+                for query in context.captured_queries
+            )
+        }
+
+    def assert_reads_replica(self, client, path="/api/recipes/"):
+        aliases = self.get_aliases(client, "get", path)
+        self.assertEqual(len(aliases), 1, aliases)
+        self.assertTrue(aliases <= set(REPLICAS), aliases)
+
+    def assert_reads_primary(self, client, path="/api/recipes/"):
+        self.assertEqual(
+            self.get_aliases(client, "get", path), {DEFAULT_DB_ALIAS}
+        )
+
+    def edit_recipe(self, client):
+        return self.get_aliases(
+            client,
+            "patch",
+            f"/api/recipes/{self.recipe.id}/",
+            {
+                "tags": [self.tag.id],
+                "ingredients": [{"id": self.ingredient.id, "amount": 20}],
+                "name": "Новое название",
+                "text": "Описание",
+                "cooking_time": 10,
+            },
+        )
+
+    def test_safe_reads_go_to_replica(self):
+        for path in (
+            "/api/recipes/",
+            f"/api/recipes/{self.recipe.id}/",
+            "/api/users/",
+            "/api/users/me/",
+        ):
+            with self.subTest(path):
+                self.assert_reads_replica(self.client, path)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(
+            self.get_aliases(
+                self.client,
+                "post",
+                f"/api/recipes/{self.recipe.id}/favorite/",
+            ),
+            {DEFAULT_DB_ALIAS},
+        )
+        self.assertEqual(self.edit_recipe(self.client), {DEFAULT_DB_ALIAS})
+
+    def test_non_api_paths_go_to_primary(self):
+        self.assert_reads_primary(
+            self.client, f"/{settings.SHORT_LINK_URL_PATH}/missing/"
+        )
+
+    def test_cookie_pin(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assert_reads_replica(client)
+        self.edit_recipe(client)
+        self.assertEqual(
+            client.cookies[PIN_COOKIE_NAME]["max-age"], PIN_SECONDS
+        )
+        self.assert_reads_primary(client)
+        # Браузер удаляет cookie по истечении max-age
+        del client.cookies[PIN_COOKIE_NAME]
+        self.assert_reads_replica(client)
+
+    def test_token_pin(self):
+        self.edit_recipe(self.client)
+        # Клиент без cookie узнаётся по токену
+        self.client.cookies.clear()
+        self.assert_reads_primary(self.client)
+        time.sleep(PIN_SECONDS + 0.5)
+        self.assert_reads_replica(self.client)
+
+    def test_other_client_keeps_reading_replica(self):
+        reader = self.get_token_client(
+            FoodgramUser.objects.create_user(
+                username="reader",
+                email="reader@example.com",
+                password="Secret-password-1",
+            )
+        )
+        self.edit_recipe(self.client)
+        self.assert_reads_primary(self.client)
+        self.assert_reads_replica(reader)
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import FoodgramUser
+
+
+class AnonymousResponseCacheTest(TestCase):
+    """Кэш ответов для анонимных пользователей."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = FoodgramUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Secret-password-1",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/recipe.png",
+        )
+        self.client = APIClient()
+
+    def get_recipes(self):
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeated_request_is_served_from_cache(self):
+        self.assertEqual(self.get_recipes()["X-Cache"], "MISS")
+        self.assertEqual(self.get_recipes()["X-Cache"], "HIT")
+
+    def test_login_does_not_invalidate_cache(self):
+        self.get_recipes()
+        response = APIClient().post(
+            "/api/auth/token/login/",
+            {"email": "author@example.com", "password": "Secret-password-1"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_recipes()["X-Cache"], "HIT")
+
+    def test_author_change_invalidates_cache(self):
+        self.get_recipes()
+        self.user.first_name = "Другое"
+        self.user.save()
+        response = self.get_recipes()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["results"][0]["author"]["first_name"], "Другое"
+        )
+
+    def test_recipe_edit_invalidates_cache(self):
+        tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        ingredient = Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        self.recipe.tags.add(tag)
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=ingredient, amount=1
+        )
+        self.get_recipes()
+        author_client = APIClient()
+        author_client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = author_client.patch(
+                f"/api/recipes/{self.recipe.id}/",
+                {
+                    "tags": [tag.id],
+                    "ingredients": [{"id": ingredient.id, "amount": 5}],
+                    "name": self.recipe.name,
+                    "text": self.recipe.text,
+                    "cooking_time": self.recipe.cooking_time,
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.get_recipes()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["results"][0]["ingredients"][0]["amount"], 5
+        )
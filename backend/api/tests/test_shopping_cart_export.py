@@ -0,0 +1,149 @@
+import csv
+import io
+import os
+import unittest
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+
+from api.pdf import StreamingPdfWriter, load_font
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            UserShoppingList)
+from users.models import FoodgramUser
+
+HAS_PDF_FONT = os.path.exists(settings.SHOPPING_LIST_PDF_FONT)
+# Количество ингредиента в каждом из рецептов
+AMOUNTS = {
+    ("мука пшеничная", "г"): (200, 300),
+    ("молоко", "мл"): (500, 250),
+    ("соль", "г"): (5, 0),
+}
+TOTAL_LINES = [
+    "молоко – 750 мл",
+    "мука пшеничная – 500 г",
+    "соль – 5 г",
+]
+
+
+def read_pdf_lines(content):
+    reader = PdfReader(io.BytesIO(content))
+    return [
+        line
+        for page in reader.pages
+        for line in page.extract_text().splitlines()
+    ]
+
+
+class ShoppingCartExportTest(TestCase):
+    """Выгрузка списка покупок в разных форматах."""
+
+    def setUp(self):
+        self.user = FoodgramUser.objects.create_user(
+            username="cook",
+            email="cook@example.com",
+            password="Secret-password-1",
+        )
+        recipes = [
+            Recipe.objects.create(
+                author=self.user,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+            )
+            for number in range(2)
+        ]
+        for (name, unit), amounts in AMOUNTS.items():
+            ingredient = Ingredient.objects.create(
+                name=name, measurement_unit=unit
+            )
+            for recipe, amount in zip(recipes, amounts):
+                if amount:
+                    RecipeIngredient.objects.create(
+                        recipe=recipe, ingredient=ingredient, amount=amount
+                    )
+        for recipe in recipes:
+            UserShoppingList.objects.create(user=self.user, recipe=recipe)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/", {"format": file_format}
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_txt(self):
+        self.assertEqual(
+            self.download("txt").decode("utf-8").splitlines(), TOTAL_LINES
+        )
+
+    def test_csv(self):
+        rows = list(csv.reader(
+            io.StringIO(self.download("csv").decode("utf-8-sig"))
+        ))
+        self.assertEqual(
+            rows,
+            [
+                ["Ингредиент", "Количество", "Единица измерения"],
+                ["молоко", "750", "мл"],
+                ["мука пшеничная", "500", "г"],
+                ["соль", "5", "г"],
+            ],
+        )
+
+    @unittest.skipUnless(HAS_PDF_FONT, "Нет шрифта для PDF")
+    def test_pdf(self):
+        content = self.download("pdf")
+        self.assertEqual(read_pdf_lines(content), TOTAL_LINES)
+        # Встраивается подмножество шрифта, а не весь файл
+        self.assertLess(len(content), 50000)
+
+    def test_unknown_format(self):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/", {"format": "xls"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(HAS_PDF_FONT, "Нет шрифта для PDF")
+class StreamingPdfWriterTest(SimpleTestCase):
+    """Постраничная запись PDF."""
+
+    def render(self, lines):
+        writer = StreamingPdfWriter(
+            load_font(settings.SHOPPING_LIST_PDF_FONT)
+        )
+        return writer, b"".join(writer.render(lines))
+
+    def test_lines_are_split_into_pages(self):
+        lines = [f"Строка {number} – ёжик" for number in range(100)]
+        writer, content = self.render(lines)
+        reader = PdfReader(io.BytesIO(content))
+        self.assertEqual(
+            len(reader.pages),
+            -(-len(lines) // writer.lines_per_page),
+        )
+        self.assertEqual(read_pdf_lines(content), lines)
+
+    def test_font_subset_contains_used_glyphs_only(self):
+        font = load_font(settings.SHOPPING_LIST_PDF_FONT)
+        writer, content = self.render(["Ёж"])
+        reader = PdfReader(io.BytesIO(content))
+        descendant = reader.pages[0]["/Resources"]["/Font"]["/F1"][
+            "/DescendantFonts"
+        ][0].get_object()
+        descriptor = descendant["/FontDescriptor"]
+        self.assertTrue(descriptor["/FontName"].endswith(f"+{font.name}"))
+        font_file = descriptor["/FontFile2"].get_data()
+        self.assertLess(len(font_file), len(font.data) // 4)
+        self.assertEqual(
+            set(writer.used_glyphs), {font.glyphs["Ё"], font.glyphs["ж"]}
+        )
+
+    def test_empty_list_has_one_page(self):
+        _, content = self.render([])
+        self.assertEqual(len(PdfReader(io.BytesIO(content)).pages), 1)
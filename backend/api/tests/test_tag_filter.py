@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+from users.models import FoodgramUser
+
+
+class RecipeTagFilterTest(TestCase):
+    """Фильтр рецептов по тегам."""
+
+    def setUp(self):
+        cache.clear()
+        author = FoodgramUser.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Secret-password-1",
+        )
+        self.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        self.recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/images/recipe.png",
+        )
+        self.recipe.tags.add(self.tag)
+        self.client = APIClient()
+
+    def test_filter_by_tag(self):
+        response = self.client.get("/api/recipes/", {"tags": "breakfast"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()["results"]],
+            [self.recipe.id],
+        )
+
+    def test_tag_deleted_after_validation_is_rejected(self):
+        unknown_tag_error = self.client.get(
+            "/api/recipes/", {"tags": "lunch"}
+        )
+        self.assertEqual(unknown_tag_error.status_code, 400)
+        Tag.objects.create(name="Обед", slug="lunch")
+        filterset = RecipeFilter(
+            QueryDict("tags=lunch"), queryset=Recipe.objects.all()
+        )
+        self.assertTrue(filterset.is_valid())
+        # Другой поток перечитал соответствие уже без тега
+        with mock.patch("api.filters.get_tag_ids_by_slug", return_value={}):
+            with self.assertRaises(ValidationError) as error:
+                filterset.qs
+        self.assertEqual(error.exception.detail, unknown_tag_error.json())
@@ -14,9 +14,11 @@ router_v1.register(
 router_v1.register("tags", api_views.TagViewSet, basename="tags")
 router_v1.register("users", api_views.UserViewSet, basename="users")
 router_v1.register("recipes", api_views.RecipeViewSet, basename="recipes")
+router_v1.register("jobs", api_views.JobViewSet, basename="jobs")
 
 
 urlpatterns = [
+    path("stats/", api_views.StatsView.as_view(), name="stats"),
     path("", include(router_v1.urls)),
     path("auth/", include("djoser.urls.authtoken")),
 ]
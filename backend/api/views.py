@@ -1,29 +1,42 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import BooleanField, Value
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.cache import (RESPONSE_CACHE_HITS_KEY, RESPONSE_CACHE_MISSES_KEY,
+                       get_counter)
 from api.filters import IngredientSearchFilter, RecipeFilter
-from api.mixins import GetListViewSet
-from api.pagination import FoodgramPagination
+from api.mixins import (AnonymousResponseCacheMixin, CatalogCacheMixin,
+                        GetListViewSet)
+from api.pagination import RecipePagination, UserPagination
 from api.permissions import IsAuthorOrReadOnly
-from api.recipes_utils import (add_recipe_to_list,
+from api.recipes_utils import (SHOPPING_CART_FORMATS, add_recipe_to_list,
+                               attach_author_recipes,
                                create_file_for_shopping_cart,
-                               delete_recipe_from_list)
+                               delete_recipe_from_list, get_recipes_limit,
+                               get_shopping_cart_format_error,
+                               get_shopping_cart_ingredients)
 from api.serializers import (AvatarSerializer, IngredientSerialiser,
-                             RecipeGetSerialiser, RecipePostSerialiser,
-                             RecipeToFavoriteSerializer,
+                             JobSerializer, RecipeGetSerialiser,
+                             RecipePostSerialiser, RecipeToFavoriteSerializer,
                              RecipeToShoppingListSerializer,
                              SubscriptionsSerializer, TagSerialiser,
                              UserSubscriptionSerializer)
-from recipes.models import (Ingredient, Recipe, RecipeIngredient, Tag,
-                            UserFavorite, UserShoppingList)
+from api.tasks import export_shopping_cart
+from backend.db.pool import get_pool_stats
+from jobs.models import Job
+from jobs.queue import get_job_stats
+from recipes.models import (Ingredient, Recipe, Tag, UserFavorite,
+                            UserShoppingList)
+from recipes.renditions import make_renditions
 from users.models import UserSubscriptions
 
 User = get_user_model()
@@ -32,7 +45,7 @@ User = get_user_model()
 class UserViewSet(UserViewSet):
     """Модифицируем UserViewSet из djoser."""
 
-    pagination_class = FoodgramPagination
+    pagination_class = UserPagination
 
     def get_permissions(self):
         if self.action == "me":
@@ -60,6 +73,7 @@ class UserViewSet(UserViewSet):
     def delete_avatar(self, request):
         if request.user.avatar:
             request.user.avatar.delete()
+            make_renditions(request.user, "avatar")
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -67,22 +81,26 @@ class UserViewSet(UserViewSet):
         detail=True,
         permission_classes=(IsAuthenticated,)
     )
+    @transaction.atomic
     def subscribe(self, request, id=None):
         """
         Подписываем или удаляем подписку текущего пользователя
         на другого пользователя.
         """
         user = request.user
+        recipes_limit = get_recipes_limit(request)
         subscription = get_object_or_404(User, pk=id)
         data = {"user": user.id, "subscription": subscription.id}
         serializer = UserSubscriptionSerializer(
-            data=data, context={"request": request}
+            data=data,
+            context={"request": request, "recipes_limit": recipes_limit}
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
+    @transaction.atomic
     def delete_subscribe(self, request, id=None):
         deleted_subscriptions = UserSubscriptions.objects.filter(
             user=request.user, subscription=get_object_or_404(User, pk=id)
@@ -98,26 +116,32 @@ class UserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Получаем список подписок текущего пользователя."""
         user = self.request.user
-        subscriptions = user.subscriptions.all()
+        recipes_limit = get_recipes_limit(request)
+        subscriptions = user.subscriptions.annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         # Добавляем пагинацию
         page = self.paginate_queryset(subscriptions)
+        # Загружаем рецепты всех авторов страницы одним запросом
+        attach_author_recipes(page, recipes_limit)
         serializer = SubscriptionsSerializer(
-            page, many=True, context={"request": request}
+            page,
+            many=True,
+            context={"request": request, "recipes_limit": recipes_limit}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(GetListViewSet):
+class IngredientViewSet(CatalogCacheMixin, GetListViewSet):
     """Представление для получения ингридиентов."""
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerialiser
     permission_classes = (AllowAny,)
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ("name",)
 
 
-class TagViewSet(GetListViewSet):
+class TagViewSet(CatalogCacheMixin, GetListViewSet):
     """Представление для получения тегов."""
 
     queryset = Tag.objects.all()
@@ -125,17 +149,28 @@ class TagViewSet(GetListViewSet):
     permission_classes = (AllowAny,)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     """Представление для рецептов."""
 
-    queryset = Recipe.objects.all()
     serializer_class = RecipeGetSerialiser
     http_method_names = ("get", "post", "patch", "delete")
-    pagination_class = FoodgramPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+        if self.action in ("list", "retrieve"):
+            return queryset.with_related()
+        return queryset
+
+    def perform_content_negotiation(self, request, force=False):
+        # Параметр format выбирает формат списка покупок, а не рендерер
+        if self.action in ("download_shopping_cart", "export_shopping_cart"):
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     def get_serializer_class(self):
         if self.action in ("create", "partial_update"):
             return RecipePostSerialiser
@@ -190,16 +225,62 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(["get"], detail=False, permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request):
         """Скачивание ингридиентов из списка покупок."""
-        user = request.user
+        return create_file_for_shopping_cart(
+            get_shopping_cart_ingredients(request.user.id),
+            request.query_params.get("format", "txt"),
+        )
 
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__usershoppinglist__user=user
-            ).values(
-                "ingredient__name", "ingredient__measurement_unit"
-            ).annotate(
-                amount=Sum("amount")
-            ).order_by("ingredient__name")
+    @action(["post"], detail=False, permission_classes=(IsAuthenticated,))
+    def export_shopping_cart(self, request):
+        """
+        Формирование файла со списком покупок в фоне.
+
+        Ссылка на файл появится в результате задачи /api/jobs/{id}/.
+        """
+        file_format = request.query_params.get("format", "txt")
+        if file_format not in SHOPPING_CART_FORMATS:
+            return get_shopping_cart_format_error()
+        job = export_shopping_cart.enqueue(
+            user=request.user,
+            user_id=request.user.id,
+            file_format=file_format,
         )
+        return Response(
+            JobSerializer(job, context={"request": request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Состояние фоновых задач текущего пользователя."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+
+class StatsView(APIView):
+    """
+    Статистика работы кэшей, очереди задач и пула соединений
+    для мониторинга.
+    """
+
+    permission_classes = (IsAdminUser,)
 
-        return create_file_for_shopping_cart(ingredients)
+    def get(self, request):
+        prefix = RecipeViewSet.response_cache_prefix
+        return Response({
+            "response_cache": {
+                "hits": get_counter(
+                    RESPONSE_CACHE_HITS_KEY.format(prefix=prefix)
+                ),
+                "misses": get_counter(
+                    RESPONSE_CACHE_MISSES_KEY.format(prefix=prefix)
+                ),
+            },
+            "jobs": get_job_stats(),
+            # Пул соединений процесса, обработавшего запрос
+            "db_pool": get_pool_stats(),
+        })
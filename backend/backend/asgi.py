@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('SERVER_MODE', 'asgi')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    # Django 3.2 выполняет синхронный код всех запросов в одном потоке.
+    # Отдельный контекст даёт каждому запросу свой поток (как в Django 4.0).
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -0,0 +1,71 @@
+from django.db import connections
+from django.db.backends.postgresql import base, creation
+
+from backend.db.pool import close_pool, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Создание тестовой базы с пулом соединений.
+
+    Перед удалением тестовой базы закрываем пулы её и зеркал (реплик
+    в тестах): их свободные соединения иначе не дают выполнить
+    DROP DATABASE.
+    """
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        alias = self.connection.alias
+        for mirror in connections:
+            if connections[mirror].settings_dict['TEST']['MIRROR'] == alias:
+                connections[mirror].close()
+                close_pool(mirror)
+        close_pool(alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с пулом соединений процесса.
+
+    Django по-прежнему закрывает соединение в конце запроса
+    (CONN_MAX_AGE = 0), но закрытие возвращает его в пул, а следующее
+    открытие берёт готовое соединение без установки нового.
+    Параметры пула задаются ключом POOL в настройках базы.
+    """
+
+    creation_class = DatabaseCreation
+    # Пул, из которого взято текущее соединение
+    connection_pool = None
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.connection_pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.checkout(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        # У соединения из пула уровень изоляции уже установлен
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        # Параметры базы могли смениться, соединение возвращается
+        # в тот пул, из которого взято
+        pool = self.connection_pool
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django продолжит работать с соединением после закрытия
+                # внутри транзакции, поэтому в пул оно не возвращается
+                pool.discard(self.connection, 'closed_broken')
+            else:
+                pool.checkin(self.connection)
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError, extensions
+
+
+class ConnectionPool:
+    """
+    Пул соединений с PostgreSQL одного процесса.
+
+    Соединение выдаётся из свободных (последнее возвращённое первым),
+    создаётся новое, пока их меньше max_size, иначе запрос ждёт
+    освобождения не дольше timeout секунд. Перед выдачей отбрасываются
+    закрытые соединения и соединения старше max_age, а пролежавшие
+    без дела дольше health_check_interval проверяются запросом SELECT 1.
+    """
+
+    def __init__(
+        self, key, max_size, timeout, max_age, health_check_interval
+    ):
+        # Параметры подключения, для которых создан пул
+        self.key = key
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+        # Закрытый пул не хранит возвращённые соединения
+        self.closed = False
+        # (соединение, время создания, время возврата в пул)
+        self.idle = deque()
+        # Выданные соединения и время их создания
+        self.in_use = {}
+        # Открытые соединения вместе с создаваемыми
+        self.size = 0
+        self.condition = threading.Condition()
+        self.stats = dict.fromkeys((
+            'checkouts',
+            'created',
+            'waits',
+            'timeouts',
+            'health_checks',
+            'closed_broken',
+            'closed_stale',
+            'closed_expired',
+        ), 0)
+        self.wait_time = 0.0
+
+    def acquire(self, deadline):
+        """
+        Берём свободное соединение или резервируем место под новое (None).
+        """
+        with self.condition:
+            waited_from = None
+            while not self.idle and self.size >= self.max_size:
+                now = time.monotonic()
+                if waited_from is None:
+                    waited_from = now
+                    self.stats['waits'] += 1
+                if now >= deadline:
+                    self.stats['timeouts'] += 1
+                    self.wait_time += now - waited_from
+                    raise OperationalError(
+                        f"Connection pool exhausted: {self.max_size} "
+                        f"connections in use for {self.timeout} s"
+                    )
+                self.condition.wait(deadline - now)
+            if waited_from is not None:
+                self.wait_time += time.monotonic() - waited_from
+            self.stats['checkouts'] += 1
+            if self.idle:
+                return self.idle.pop()
+            self.size += 1
+            return None
+
+    def checkout(self, connect):
+        """Выдаём соединение, создавая его функцией connect при нехватке."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry = self.acquire(deadline)
+            if entry is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self.release()
+                    raise
+                with self.condition:
+                    self.stats['created'] += 1
+                    self.in_use[connection] = time.monotonic()
+                return connection
+            connection, created_at, returned_at = entry
+            reason = self.get_unusable_reason(
+                connection, created_at, returned_at
+            )
+            if reason is None:
+                with self.condition:
+                    self.in_use[connection] = created_at
+                return connection
+            self.discard(connection, reason)
+
+    def get_unusable_reason(self, connection, created_at, returned_at):
+        now = time.monotonic()
+        if connection.closed:
+            return 'closed_broken'
+        if self.max_age is not None and now - created_at > self.max_age:
+            return 'closed_expired'
+        if now - returned_at > self.health_check_interval:
+            with self.condition:
+                self.stats['health_checks'] += 1
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                if (
+                    connection.get_transaction_status()
+                    != extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    connection.rollback()
+            except Exception:
+                return 'closed_stale'
+        return None
+
+    def checkin(self, connection):
+        """
+        Возвращаем соединение в пул.
+
+        Незавершённая транзакция откатывается, а соединение
+        в неизвестном состоянии закрывается.
+        """
+        with self.condition:
+            created_at = self.in_use.pop(connection, None)
+        if created_at is None:
+            # Соединение выдано не этим пулом (например, до fork)
+            connection.close()
+            return
+        if self.closed:
+            self.discard(connection)
+            return
+        status = (
+            extensions.TRANSACTION_STATUS_UNKNOWN
+            if connection.closed
+            else connection.get_transaction_status()
+        )
+        if status in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_INERROR,
+        ):
+            try:
+                connection.rollback()
+                status = connection.get_transaction_status()
+            except Exception:
+                status = extensions.TRANSACTION_STATUS_UNKNOWN
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            self.discard(connection, 'closed_broken')
+            return
+        with self.condition:
+            self.idle.append((connection, created_at, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection, reason=None):
+        """Закрываем соединение и освобождаем его место в пуле."""
+        with self.condition:
+            self.in_use.pop(connection, None)
+            if reason is not None:
+                self.stats[reason] += 1
+        try:
+            connection.close()
+        finally:
+            self.release()
+
+    def release(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close_idle(self):
+        """Закрываем все свободные соединения."""
+        with self.condition:
+            idle = list(self.idle)
+            self.idle.clear()
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for connection, _, _ in idle:
+            connection.close()
+
+    def close(self):
+        """
+        Закрываем пул: свободные соединения сразу, выданные — при возврате.
+        """
+        with self.condition:
+            self.closed = True
+        self.close_idle()
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'pid': self.pid,
+                'max_size': self.max_size,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': len(self.in_use),
+                **self.stats,
+                'wait_time': round(self.wait_time, 3),
+            }
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool_key(settings_dict):
+    """Параметры, от которых зависит, к какой базе ведёт соединение."""
+    return tuple(
+        settings_dict.get(name)
+        for name in ('NAME', 'HOST', 'PORT', 'USER')
+    )
+
+
+def get_pool(alias, settings_dict):
+    """
+    Пул соединений для базы alias или None, если пул отключён.
+
+    Дочерний процесс после fork создаёт собственный пул. При смене
+    параметров подключения (например, когда тесты переключают базу
+    на test_*) прежний пул закрывается и создаётся новый.
+    """
+    options = settings_dict.get('POOL', {})
+    max_size = options.get('MAX_SIZE', 0)
+    if max_size < 1:
+        return None
+    key = get_pool_key(settings_dict)
+    with pools_lock:
+        pool = pools.get(alias)
+        if pool is not None and pool.pid == os.getpid() and pool.key != key:
+            pool.close()
+            pool = None
+        if pool is None or pool.pid != os.getpid():
+            pool = pools[alias] = ConnectionPool(
+                key=key,
+                max_size=max_size,
+                timeout=options.get('TIMEOUT', 10),
+                max_age=options.get('MAX_AGE'),
+                health_check_interval=options.get(
+                    'HEALTH_CHECK_INTERVAL', 10
+                ),
+            )
+        return pool
+
+
+def get_pool_stats():
+    """Статистика пулов текущего процесса по именам баз."""
+    with pools_lock:
+        return {
+            alias: pool.get_stats()
+            for alias, pool in pools.items()
+            if pool.pid == os.getpid()
+        }
+
+
+def close_pool(alias):
+    """Закрываем пул базы alias, следующее подключение создаст новый."""
+    with pools_lock:
+        pool = pools.pop(alias, None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+
+
+def close_idle_connections():
+    with pools_lock:
+        for pool in pools.values():
+            if pool.pid == os.getpid():
+                pool.close_idle()
+
+
+# Свободные соединения не должны наследоваться дочерними процессами
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=close_idle_connections)
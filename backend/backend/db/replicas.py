@@ -0,0 +1,113 @@
+"""
+Чтение с реплик PostgreSQL.
+
+Middleware выбирает для безопасного запроса к API одну из реплик,
+а роутер направляет на неё чтение этого запроса. Записи и все запросы
+вне выбранных (команды, фоновые задачи, админка) работают с основной
+базой. После записи клиент читает с основной базы ещё
+REPLICA_PIN_SECONDS секунд, чтобы видеть свои изменения: признак
+хранится в cookie и, для клиентов с токеном, в кэше Django.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import get_authorization_header
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE_NAME = 'primary_pin'
+PIN_TOKEN_KEY = 'primary_pin:{key_hash}'
+
+# Реплика, с которой читает текущий запрос, или None
+current_replica = ContextVar('current_replica', default=None)
+
+
+def get_read_alias():
+    return current_replica.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_primary():
+    """Читаем внутри блока с основной базы."""
+    token = current_replica.set(None)
+    try:
+        yield
+    finally:
+        current_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Роутер: чтение с реплики запроса, остальное — с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_token_pin_key(request):
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b'token':
+        return None
+    key_hash = sha256(auth[1]).hexdigest()
+    return PIN_TOKEN_KEY.format(key_hash=key_hash)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Направляем на реплики безопасные запросы к REPLICA_READ_PATHS.
+
+    Клиент, недавно выполнивший запись, читает с основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_replica(self, request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+            or not request.path.startswith(settings.REPLICA_READ_PATHS)
+            or PIN_COOKIE_NAME in request.COOKIES
+        ):
+            return None
+        pin_key = get_token_pin_key(request)
+        if pin_key is not None and cache.get(pin_key):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def pin_to_primary(self, request, response):
+        seconds = settings.REPLICA_PIN_SECONDS
+        response.set_cookie(
+            PIN_COOKIE_NAME, '1', max_age=seconds,
+            httponly=True, samesite='Lax',
+        )
+        pin_key = get_token_pin_key(request)
+        if pin_key is not None:
+            cache.set(pin_key, True, seconds)
+
+    def __call__(self, request):
+        token = current_replica.set(self.get_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            self.pin_to_primary(request, response)
+        return response
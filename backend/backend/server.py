@@ -0,0 +1,142 @@
+"""
+Настройки gunicorn для запуска проекта.
+
+Запуск: gunicorn --config python:backend.server
+
+Количество воркеров и потоков считается по доступным процессору
+ядрам и переопределяется переменными окружения GUNICORN_*.
+Больше одного воркера запускается только с общим кэшем.
+"""
+
+import asyncio
+import math
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+# Запросы, которые выполняются перед приёмом трафика: они загружают
+# маршруты, сериализаторы и справочники в память процесса
+WARMUP_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/',
+)
+
+
+def get_cpu_count():
+    """Доступные процессу ядра с учётом ограничений cgroup контейнера."""
+    try:
+        cpu_count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_count = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as quota_file:
+                quota = quota_file.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as period_file:
+                period = period_file.read().strip()
+        except OSError:
+            pass
+    if quota not in (None, 'max', '-1'):
+        cpu_count = min(cpu_count, math.ceil(int(quota) / int(period)))
+    return max(cpu_count, 1)
+
+
+def get_int(name, default):
+    return int(os.getenv(name, default))
+
+
+cpu_count = get_cpu_count()
+server_mode = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+if server_mode == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # Конкурентность обеспечивает цикл событий, хватает воркера на ядро
+    workers = get_int('GUNICORN_WORKERS', cpu_count)
+else:
+    wsgi_app = 'backend.wsgi:application'
+    worker_class = 'gthread'
+    workers = get_int('GUNICORN_WORKERS', 2 * cpu_count + 1)
+    # Потоки не дают медленным клиентам и выгрузкам файлов
+    # занимать весь воркер
+    threads = get_int('GUNICORN_THREADS', 4)
+
+# Версии данных и счётчики хранятся в кэше Django. Воркеры видят
+# изменения друг друга, только если кэш общий (CACHE_BACKEND).
+if workers > 1:
+    from api.cache import is_cache_shared
+
+    if not is_cache_shared():
+        raise RuntimeError(
+            'GUNICORN_WORKERS > 1 requires a shared CACHE_BACKEND '
+            '(memcached); the process-local cache would serve stale data.'
+        )
+
+# Приложение загружается один раз до запуска воркеров,
+# и они получают прогретую память процесса
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Выгрузка списка покупок в PDF может занимать больше 30 секунд
+timeout = get_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = get_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = get_int('GUNICORN_KEEPALIVE', 5)
+
+# Воркер перезапускается после max_requests запросов, чтобы рост
+# памяти был ограничен. Разброс не даёт воркерам уйти одновременно.
+max_requests = get_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = get_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# Файлы контроля воркеров в памяти, а не на диске контейнера
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def warmup(log):
+    """Прогреваем процесс перед приёмом трафика."""
+    from asgiref.sync import async_to_sync
+    from django.db import connections
+    from django.test import RequestFactory
+    from django.urls import get_resolver, resolve
+
+    from recipes.short_links import short_link_cache
+
+    started_at = time.monotonic()
+    # Строим таблицы маршрутов для resolve и reverse
+    get_resolver().reverse_dict
+    factory = RequestFactory()
+    for path in WARMUP_PATHS:
+        request = factory.get(path)
+        match = resolve(request.path_info)
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        try:
+            response = view(request, *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception as error:
+            log.warning('Warmup request %s failed: %s', path, error)
+    short_link_cache.warm()
+    # Соединения с БД не должны переходить в дочерние процессы
+    connections.close_all()
+    log.info('Warmup finished in %.2f s', time.monotonic() - started_at)
+
+
+def when_ready(server):
+    if preload_app:
+        warmup(server.log)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        warmup(worker.log)
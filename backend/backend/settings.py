@@ -36,11 +36,13 @@ INSTALLED_APPS = [
     'djoser',
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
-    'users.apps.UsersConfig'
+    'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'backend.db.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +70,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Режим запуска: wsgi (синхронные воркеры gunicorn) или asgi (воркеры
+# uvicorn). В режиме asgi переходы по коротким ссылкам из кэша процесса
+# обрабатываются в цикле событий, остальные представления — в потоках.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
 
 
 # Database
@@ -83,12 +91,62 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # PostgreSQL с пулом соединений процесса (backend/db)
+        'ENGINE': 'backend.db',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'POOL': {
+            # Соединений на процесс, 0 отключает пул
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            # Сколько ждать свободного соединения (секунды)
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            # Время жизни соединения (секунды)
+            'MAX_AGE': int(os.getenv('DB_POOL_MAX_AGE', 1800)),
+            # Соединения, простоявшие дольше, проверяются перед выдачей
+            'HEALTH_CHECK_INTERVAL': int(
+                os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 10)
+            ),
+        },
+    }
+}
+
+# Реплики для чтения через запятую: host[:port][/name].
+# Пользователь, пароль и остальные параметры как у основной базы.
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        # В тестах реплика совпадает с основной базой
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['backend.db.replicas.ReplicaRouter']
+# Запросы к API, которые можно выполнять на репликах
+REPLICA_READ_PATHS = (
+    '/api/recipes/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/users/',
+)
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -148,7 +206,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -165,7 +223,76 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
-SHORT_CODE_LENGTH = 6
+# Коды коротких ссылок получаются из id рецепта, поэтому после запуска
+# проекта длину и параметры преобразования менять нельзя.
+# Старые случайные коды были длиной 6 символов и с новыми не пересекаются.
+SHORT_CODE_LENGTH = 7
+SHORT_CODE_MULTIPLIER = int(os.getenv('SHORT_CODE_MULTIPLIER', 2176477521739))
+SHORT_CODE_OFFSET = int(os.getenv('SHORT_CODE_OFFSET', 1580030173))
 SHORT_LINK_URL_PATH = 's'
+# Количество кодов коротких ссылок в кэше каждого процесса
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 10000))
+# Сколько секунд найденный код используется без перепроверки в БД
+SHORT_LINK_CACHE_TTL = int(os.getenv('SHORT_LINK_CACHE_TTL', 300))
+# Сколько секунд помнить, что кода нет в БД
+SHORT_LINK_MISSING_TTL = int(os.getenv('SHORT_LINK_MISSING_TTL', 30))
+
+# Кэш пользователей для аутентификации по токену
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+# Время жизни записи кэша (секунды)
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+# Хранить снимки пользователей также в общем кэше Django
+AUTH_TOKEN_CACHE_SHARED = os.getenv('AUTH_TOKEN_CACHE_SHARED') == 'True'
 
 DEFAULT_PAGE_SIZE = 10
+
+# Время жизни закэшированного количества рецептов в пагинации (секунды)
+RECIPES_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('RECIPES_COUNT_CACHE_TIMEOUT', 60)
+)
+# Начиная с этой оценки планировщика количество рецептов не пересчитывается
+RECIPES_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('RECIPES_COUNT_ESTIMATE_THRESHOLD', 10000)
+)
+
+# Начиная с этой оценки количества найденных рецептов они выдаются
+# по дате, а не по релевантности
+RECIPES_SEARCH_RANK_THRESHOLD = int(
+    os.getenv('RECIPES_SEARCH_RANK_THRESHOLD', 20000)
+)
+
+# Фильтровать рецепты по битовой маске тегов вместо подзапроса к RecipeTag
+RECIPE_TAGS_MASK_FILTER = os.getenv('RECIPE_TAGS_MASK_FILTER') == 'True'
+
+# Время жизни кэша ответов для анонимных пользователей (секунды)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Время, в течение которого клиенты могут не перепроверять справочники
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', 60))
+# Как долго процесс отдаёт справочник из памяти без перечитывания БД
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 60))
+
+# Шрифт с кириллицей для списка покупок в PDF
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+# Количество строк, читаемых из БД за раз при выгрузке списка покупок
+SHOPPING_LIST_CHUNK_SIZE = int(os.getenv('SHOPPING_LIST_CHUNK_SIZE', 500))
+
+# Фоновые задачи
+# Количество процессов, запускаемых командой run_workers
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', 2))
+# Пауза между опросами пустой очереди (секунды)
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_DEFAULT_TIMEOUT = int(os.getenv('JOBS_DEFAULT_TIMEOUT', 300))
+JOBS_DEFAULT_MAX_ATTEMPTS = int(os.getenv('JOBS_DEFAULT_MAX_ATTEMPTS', 3))
+# Задержка перед первым повтором, дальше она удваивается (секунды)
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+# Запас времени, после которого выполняемая задача считается зависшей
+JOBS_STALE_GRACE = int(os.getenv('JOBS_STALE_GRACE', 60))
+JOBS_STALE_CHECK_INTERVAL = int(os.getenv('JOBS_STALE_CHECK_INTERVAL', 60))
+# Сколько хранить завершённые задачи и их файлы (секунды)
+JOBS_KEEP_FINISHED = int(os.getenv('JOBS_KEEP_FINISHED', 7 * 24 * 3600))
+# Выполнять задачи сразу после коммита без обработчиков (для разработки)
+JOBS_EAGER = os.getenv('JOBS_EAGER') == 'True'
@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Отображение фоновых задач."""
+
+    list_display = (
+        "id", "name", "status", "attempts", "run_at", "finished_at"
+    )
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "started_at", "finished_at", "worker")
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,72 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Запуск обработчиков фоновых задач. "
+        "Пример команды: python manage.py run_workers --processes 2"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help="Количество процессов-обработчиков.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, секунды.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if processes < 1:
+            raise CommandError("--processes должен быть больше 0")
+        if processes == 1 or options["once"]:
+            self.run_worker(options["poll_interval"], options["once"])
+            return
+
+        # Соединения с БД не должны наследоваться дочерними процессами
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        workers = []
+        while not self.stopping:
+            workers = [worker for worker in workers if worker.is_alive()]
+            for _ in range(processes - len(workers)):
+                worker = context.Process(
+                    target=self.run_worker,
+                    args=(options["poll_interval"], False),
+                    daemon=True,
+                )
+                worker.start()
+                workers.append(worker)
+            time.sleep(1)
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def run_worker(self, poll_interval, once):
+        Worker(poll_interval, self.stdout.write).run(once)
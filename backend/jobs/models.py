@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача, выполняемая командой run_workers."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ожидает"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Выполнена"
+        FAILED = "failed", "Ошибка"
+
+    name = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Параметры", default=dict, blank=True)
+    result = models.JSONField("Результат", null=True, blank=True)
+    status = models.CharField(
+        "Статус",
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveSmallIntegerField("Максимум попыток")
+    timeout = models.PositiveIntegerField("Ограничение времени, с")
+    run_at = models.DateTimeField("Запустить после", default=timezone.now)
+    created_at = models.DateTimeField("Создана", auto_now_add=True)
+    started_at = models.DateTimeField("Начата", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+    worker = models.CharField("Обработчик", max_length=100, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    class Meta:
+        verbose_name = "фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        default_related_name = "jobs"
+        ordering = ("-created_at",)
+        indexes = [
+            # Выбор следующей задачи и поиск зависших
+            models.Index(
+                fields=("status", "run_at"), name="job_status_run_at_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
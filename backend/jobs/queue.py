@@ -0,0 +1,222 @@
+import signal
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+from jobs.models import Job
+
+# Зарегистрированные задачи по имени
+TASKS = {}
+
+
+class JobTimeout(Exception):
+    """Задача не уложилась в отведённое время."""
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне."""
+
+    def __init__(self, func, name, timeout, max_attempts, on_purge):
+        self.func = func
+        self.name = name
+        self.timeout = timeout or settings.JOBS_DEFAULT_TIMEOUT
+        self.max_attempts = max_attempts or settings.JOBS_DEFAULT_MAX_ATTEMPTS
+        self.on_purge = on_purge
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+    def enqueue(self, user=None, delay=0, **payload):
+        """
+        Ставим задачу в очередь.
+
+        Строка задачи пишется в текущей транзакции, поэтому обработчики
+        увидят её только вместе с данными, для которых она создана.
+        """
+        job = Job.objects.create(
+            name=self.name,
+            payload=payload,
+            user=user,
+            timeout=self.timeout,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+        if settings.JOBS_EAGER:
+            transaction.on_commit(lambda: run_job(claim_job("eager", job.pk)))
+        return job
+
+
+def task(name, timeout=None, max_attempts=None, on_purge=None):
+    """
+    Регистрируем функцию как фоновую задачу.
+
+    Функция получает параметры задачи именованными аргументами
+    и возвращает результат, который можно сохранить в JSON.
+    on_purge вызывается с результатом при удалении старой задачи.
+    """
+    def decorator(func):
+        TASKS[name] = Task(func, name, timeout, max_attempts, on_purge)
+        return TASKS[name]
+    return decorator
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Прерываем выполнение исключением JobTimeout через seconds секунд.
+
+    Работает через SIGALRM, поэтому только в главном потоке.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        raise JobTimeout(f"Задача выполнялась дольше {seconds} с")
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def claim_job(worker, pk=None):
+    """
+    Забираем следующую готовую к запуску задачу.
+
+    Строка блокируется через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому несколько обработчиков не получат одну и ту же задачу.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.Status.PENDING, run_at__lte=now
+        )
+        if pk is not None:
+            jobs = jobs.filter(pk=pk)
+        job = jobs.order_by("run_at", "id").first()
+        if job is None:
+            return None
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.finished_at = None
+        job.worker = worker
+        job.save(update_fields=(
+            "status", "attempts", "started_at", "finished_at", "worker"
+        ))
+    return job
+
+
+def fail_job(job, error):
+    """Планируем повтор задачи с растущей задержкой или завершаем её."""
+    job.last_error = error
+    job.finished_at = timezone.now()
+    if job.attempts < job.max_attempts:
+        job.status = Job.Status.PENDING
+        job.run_at = job.finished_at + timedelta(
+            seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+    else:
+        job.status = Job.Status.FAILED
+    job.save(update_fields=("status", "run_at", "finished_at", "last_error"))
+
+
+def run_job(job):
+    """Выполняем задачу и сохраняем результат или ошибку."""
+    if job is None:
+        return None
+    task = TASKS.get(job.name)
+    try:
+        if task is None:
+            raise LookupError(f"Задача {job.name} не зарегистрирована")
+        with time_limit(job.timeout):
+            result = task(**job.payload)
+    except Exception:
+        fail_job(job, traceback.format_exc())
+        return job
+    job.status = Job.Status.DONE
+    job.result = result
+    job.last_error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=("status", "result", "last_error", "finished_at"))
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Возвращаем в очередь задачи, обработчик которых перестал отвечать.
+
+    Задача считается зависшей, если она выполняется дольше своего
+    ограничения времени с запасом JOBS_STALE_GRACE.
+    """
+    now = timezone.now()
+    grace = timedelta(seconds=settings.JOBS_STALE_GRACE)
+    requeued = 0
+    for job in Job.objects.filter(
+        status=Job.Status.RUNNING, started_at__lt=now - grace
+    ):
+        if job.started_at + timedelta(seconds=job.timeout) + grace > now:
+            continue
+        with transaction.atomic():
+            locked = Job.objects.select_for_update(skip_locked=True).filter(
+                pk=job.pk,
+                status=Job.Status.RUNNING,
+                started_at=job.started_at,
+            ).first()
+            if locked is None:
+                continue
+            fail_job(locked, f"Обработчик {locked.worker} не ответил")
+        requeued += 1
+    return requeued
+
+
+def purge_finished_jobs():
+    """Удаляем завершённые задачи старше JOBS_KEEP_FINISHED секунд."""
+    jobs = Job.objects.filter(
+        status__in=(Job.Status.DONE, Job.Status.FAILED),
+        finished_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_KEEP_FINISHED
+        ),
+    )
+    names = [name for name, task in TASKS.items() if task.on_purge]
+    for name, result in jobs.filter(
+        name__in=names, result__isnull=False
+    ).values_list("name", "result").iterator():
+        TASKS[name].on_purge(result)
+    return jobs.delete()[0]
+
+
+def get_job_stats():
+    """Метрики очереди: количество задач по статусам и время выполнения."""
+    stats = {status: 0 for status in Job.Status.values}
+    tasks = {}
+    for row in Job.objects.order_by().values("name", "status").annotate(
+        total=Count("id"),
+        duration=Avg(F("finished_at") - F("started_at")),
+    ):
+        stats[row["status"]] += row["total"]
+        task_stats = tasks.setdefault(row["name"], {})
+        task_stats[row["status"]] = row["total"]
+        if row["status"] == Job.Status.DONE and row["duration"] is not None:
+            task_stats["avg_duration"] = round(
+                row["duration"].total_seconds(), 3
+            )
+    oldest = Job.objects.filter(
+        status=Job.Status.PENDING, run_at__lte=timezone.now()
+    ).aggregate(oldest=Min("run_at"))["oldest"]
+    stats["queue_delay"] = (
+        round((timezone.now() - oldest).total_seconds(), 3)
+        if oldest else 0
+    )
+    stats["tasks"] = tasks
+    return stats
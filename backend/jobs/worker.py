@@ -0,0 +1,70 @@
+import os
+import random
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from jobs.queue import (claim_job, purge_finished_jobs, requeue_stale_jobs,
+                        run_job)
+
+
+class Worker:
+    """
+    Обработчик очереди задач.
+
+    Забирает задачи по одной, а когда очередь пуста, ждёт
+    poll_interval секунд. По SIGTERM и SIGINT завершает текущую
+    задачу и останавливается.
+    """
+
+    def __init__(self, poll_interval, log):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.log = log
+        self.running = True
+        self.next_stale_check = 0
+
+    def stop(self, signum, frame):
+        self.running = False
+
+    def run(self, once=False):
+        """Обрабатываем задачи; при once=True — пока очередь не опустеет."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.log(f"Обработчик {self.name} запущен")
+        while self.running:
+            self.check_stale_jobs()
+            job = claim_job(self.name)
+            if job is None:
+                close_old_connections()
+                if once:
+                    break
+                # Случайная добавка разносит опросы разных обработчиков
+                time.sleep(self.poll_interval * random.uniform(0.5, 1.5))
+                continue
+            started_at = time.monotonic()
+            run_job(job)
+            self.log(
+                f"{job}: {job.get_status_display()}, попытка "
+                f"{job.attempts}/{job.max_attempts}, "
+                f"{time.monotonic() - started_at:.3f} s"
+            )
+            close_old_connections()
+        self.log(f"Обработчик {self.name} остановлен")
+
+    def check_stale_jobs(self):
+        """Раз в JOBS_STALE_CHECK_INTERVAL секунд чистим очередь."""
+        if time.monotonic() < self.next_stale_check:
+            return
+        self.next_stale_check = (
+            time.monotonic() + settings.JOBS_STALE_CHECK_INTERVAL
+        )
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.log(f"Возвращено в очередь зависших задач: {requeued}")
+        purged = purge_finished_jobs()
+        if purged:
+            self.log(f"Удалено завершённых задач: {purged}")
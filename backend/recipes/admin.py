@@ -56,9 +56,11 @@ class RecipeAdmin(admin.ModelAdmin):
         "count_favorites",
     )
 
-    @admin.display(description="Добавлений в избранное")
+    @admin.display(
+        description="Добавлений в избранное", ordering="favorites_count"
+    )
     def count_favorites(self, obj):
-        return obj.userfavorite.count()
+        return obj.favorites_count
 
     def get_readonly_fields(self, request, obj=None):
         readonly_fields = super().get_readonly_fields(request, obj)
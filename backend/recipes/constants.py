@@ -4,7 +4,13 @@ from django.utils.translation import gettext_lazy as _
 NAME_MAX_LENGHT = 150
 TAG_NAME_MAX_LENGHT = 50
 MEASUREMENT_NAME_MAX_LENGHT = 10
-SHORT_URL_CODE_MAX_LENGTH = 6
+SHORT_URL_CODE_MAX_LENGTH = 8
+# Теги с id от 1 до TAGS_MASK_BITS помещаются в битовую маску рецепта
+TAGS_MASK_BITS = 63
+# Размеры вариантов изображений (ширина, высота)
+RECIPE_THUMB_SIZE = (480, 480)
+RECIPE_DETAIL_SIZE = (1280, 1280)
+AVATAR_THUMB_SIZE = (128, 128)
 MIN_AMOUNT = 1
 MAX_AMOUNT = 32766
 
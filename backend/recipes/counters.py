@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, UserFavorite, UserShoppingList
+from users.models import UserSubscriptions
+
+User = get_user_model()
+
+# Модель со счётчиком, поле счётчика, считаемая модель и её поле-ссылка
+COUNTERS = (
+    (Recipe, "favorites_count", UserFavorite, "recipe"),
+    (Recipe, "shopping_cart_count", UserShoppingList, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", UserSubscriptions, "subscription"),
+)
+
+
+def recount_counter(model, field, counted_model, counted_field, fix=True):
+    """
+    Сверяем счётчик с реальным количеством связанных объектов.
+
+    Возвращаем количество объектов с расхождением; при fix=True
+    исправляем их одним запросом UPDATE.
+    """
+    actual = Coalesce(
+        Subquery(
+            counted_model.objects.filter(
+                **{counted_field: OuterRef("pk")}
+            ).order_by().values(counted_field).annotate(
+                total=Count("pk")
+            ).values("total")
+        ),
+        0,
+    )
+    drifted = model._default_manager.exclude(**{field: actual})
+    if not fix:
+        return drifted.count()
+    return drifted.update(**{field: actual})
@@ -0,0 +1,78 @@
+from django.shortcuts import get_object_or_404
+from django.test import RequestFactory
+
+from api.benchmarks import BenchmarkCommand, measure
+from recipes.models import Recipe
+from recipes.short_links import short_link_cache
+from recipes.views import expand, redirect_to_recipe
+from users.models import FoodgramUser
+
+
+def expand_from_db(request, uniq_id):
+    """Прежнее представление: полная строка рецепта из БД."""
+    recipe = get_object_or_404(Recipe, short_url_code=uniq_id)
+    return redirect_to_recipe(request, recipe.id)
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Замер переходов по коротким ссылкам: коды из кэша процесса, "
+        "отсутствующие коды и прежний запрос рецепта к БД. "
+        "Пример команды: python manage.py bench_short_links --requests 20000"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=1000,
+            help="Количество рецептов.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20000,
+            help="Количество переходов в каждом замере.",
+        )
+
+    def is_seeded(self):
+        return Recipe.objects.exists()
+
+    def seed(self, options):
+        author = FoodgramUser.objects.create_user(
+            username="bench", email="bench@example.com", password="bench"
+        )
+        for number in range(options["recipes"]):
+            Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+            )
+
+    def run(self, options):
+        codes = list(
+            Recipe.objects.values_list("short_url_code", flat=True)
+        )
+        requests_count = options["requests"]
+        request = RequestFactory().get("/")
+        short_link_cache.warm()
+        cases = (
+            ("cached codes", expand, codes),
+            ("missing codes", expand, ["missing"]),
+            ("recipe row from DB (old)", expand_from_db, codes),
+        )
+        for name, view, case_codes in cases:
+
+            def follow_links():
+                for number in range(requests_count):
+                    view(request, case_codes[number % len(case_codes)])
+
+            milliseconds = measure(follow_links, options["repeat"])
+            self.report(
+                name,
+                milliseconds / requests_count,
+                f"{requests_count * 1000 / milliseconds:.0f} redirects/s",
+            )
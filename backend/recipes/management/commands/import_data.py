@@ -1,9 +1,19 @@
 import csv
 import os
 import shutil
+import time
+from itertools import islice
 
 from django.apps import apps
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.cache import (CATALOG_VERSION_KEY, RECIPES_VERSION_KEY,
+                       bump_cache_version, is_cache_shared)
+from recipes.counters import COUNTERS, recount_counter
+from recipes.models import Recipe
+from recipes.short_code_generator import fill_missing_short_codes
 
 triples = [
     "recipes:Ingredient:data/ingredients.csv",
@@ -20,29 +30,69 @@ recipe_src_file = "data/default_recipe_image.png"
 avatar_dest_directory = "media/users"
 recipe_dest_directory = "media/recipes/images"
 
+DEFAULT_BATCH_SIZE = 1000
+
 
 class Command(BaseCommand):
     help = (
-        "Загрузка данных из csv-файлов в модели. ",
-        "Пример команды: python manage.py import_data ",
+        "Загрузка данных из csv-файлов в модели. "
+        "Пример команды: python manage.py import_data "
+        "[app:Model:path/to/file.csv ...] [--batch-size 1000]. "
+        "Запущенные серверы увидят новые данные сразу только при общем "
+        "кэше (CACHE_BACKEND), иначе их нужно перезапустить."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "triples",
+            nargs="*",
+            help=(
+                "Файлы для загрузки в формате app:Model:path. "
+                "По умолчанию загружаются тестовые данные проекта."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Количество строк в одном INSERT.",
+        )
+
     def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size должен быть больше 0")
+
         # Копируем файлы с изображениями товаров
         self.copy_file(avatar_src_file, avatar_dest_directory)
         self.copy_file(recipe_src_file, recipe_dest_directory)
 
-        for triple in triples:
+        imported_models = []
+        for triple in options["triples"] or triples:
             parts = triple.split(":")
             if len(parts) == 3:
                 app_name, model_name, csv_file_path = parts
                 model = apps.get_model(app_name, model_name)
-                self.import_data(model, csv_file_path)
+                self.import_data(model, csv_file_path, batch_size)
+                imported_models.append(model)
             else:
                 self.stdout.write(
                     self.style.ERROR(f"Неверный формат: '{triple}'")
                 )
 
+        self.reset_sequences(imported_models)
+        self.recount_counters(imported_models)
+        # bulk_create не отправляет сигналы, меняем версии вручную.
+        # Команда работает в отдельном процессе, поэтому серверы
+        # получат новые версии только через общий кэш.
+        bump_cache_version(RECIPES_VERSION_KEY)
+        bump_cache_version(CATALOG_VERSION_KEY)
+        if not is_cache_shared():
+            self.stdout.write(self.style.WARNING(
+                "Кэш не общий для процессов: перезапустите серверы, "
+                "чтобы они перестали отдавать прежние данные."
+            ))
+
     def copy_file(self, src_file, dest_dir):
         if not os.path.exists(dest_dir):
             os.makedirs(dest_dir)
@@ -54,17 +104,59 @@ class Command(BaseCommand):
             )
         )
 
-    def import_data(self, model, csv_file_path):
+    def read_batches(self, reader, field_names, batch_size):
+        """Читаем строки файла пачками по batch_size."""
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            yield [dict(zip(field_names, row)) for row in rows]
+
+    def import_data(self, model, csv_file_path, batch_size):
+        started_at = time.monotonic()
+        rows_count = 0
         with open(csv_file_path, newline="", encoding="utf-8") as csvfile:
             reader = csv.reader(csvfile)
             field_names = next(reader)  # Получение заголовков
-            for row in reader:
-                data = {
-                    field_names[i]: row[i] for i in range(len(field_names))
-                }
-                # Распаковываем словарь и создаем объект модели
-                model.objects.create(**data)
+            # Один файл загружается в одной транзакции
+            with transaction.atomic():
+                for batch in self.read_batches(
+                    reader, field_names, batch_size
+                ):
+                    objects = [model(**data) for data in batch]
+                    model.objects.bulk_create(objects, batch_size=batch_size)
+                    rows_count += len(objects)
+                # Коды коротких ссылок получаются из id рецептов
+                if model._meta.label == "recipes.Recipe":
+                    fill_missing_short_codes(batch_size)
+                # bulk_create не отправляет сигналы, маски тегов
+                # пересчитываем после загрузки
+                if model._meta.label == "recipes.RecipeTag":
+                    Recipe.objects.update_tags_mask()
 
+        elapsed = time.monotonic() - started_at
         self.stdout.write(
-            self.style.SUCCESS(f"Successfully imported data {model}")
+            self.style.SUCCESS(
+                f"Successfully imported data {model}: {rows_count} rows "
+                f"in {elapsed:.2f} s "
+                f"({rows_count / max(elapsed, 1e-6):.0f} rows/s)"
+            )
         )
+
+    def recount_counters(self, models):
+        """Пересчитываем счётчики, зависящие от загруженных моделей."""
+        for model, field, counted_model, counted_field in COUNTERS:
+            if counted_model in models:
+                with transaction.atomic():
+                    recount_counter(
+                        model, field, counted_model, counted_field
+                    )
+
+    def reset_sequences(self, models):
+        """Сдвигаем счётчики id после загрузки строк с явными id."""
+        sql_list = connection.ops.sequence_reset_sql(no_style(), models)
+        if not sql_list:
+            return
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
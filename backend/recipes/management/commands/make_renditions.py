@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.renditions import RENDITIONS, make_renditions
+from recipes.tasks import make_renditions_later
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Создание вариантов картинок рецептов и аватаров, "
+        "для которых они ещё не созданы. "
+        "Пример команды: python manage.py make_renditions [--force]"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать варианты для всех изображений.",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Поставить создание вариантов в очередь задач.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name in ((Recipe, "image"), (User, "avatar")):
+            self.make_model_renditions(
+                model, field_name, options["force"], options["background"]
+            )
+
+    def make_model_renditions(self, model, field_name, force, background):
+        started_at = time.monotonic()
+        names = {rendition.name for rendition in RENDITIONS[field_name]}
+        objects = model.objects.exclude(**{field_name: ""}).only(
+            "id", field_name, f"{field_name}_renditions"
+        ).order_by("id")
+        done = failed = 0
+        for obj in objects.iterator():
+            renditions = getattr(obj, f"{field_name}_renditions")
+            if not force and names <= set(renditions):
+                continue
+            if background:
+                make_renditions_later(obj, field_name)
+                done += 1
+                continue
+            try:
+                make_renditions(obj, field_name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stdout.write(self.style.ERROR(
+                    f"{model._meta.label} {obj.pk}: {error}"
+                ))
+                continue
+            done += 1
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{model._meta.label}.{field_name}: "
+                f"{'в очереди' if background else 'создано'} для {done}, "
+                f"ошибок {failed}, {elapsed:.2f} s"
+            )
+        )
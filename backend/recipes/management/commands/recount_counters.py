@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, recount_counter
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчёт счётчиков избранного, списков покупок, рецептов "
+        "и подписчиков. Пример команды: "
+        "python manage.py recount_counters [--dry-run]"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать количество расхождений.",
+        )
+
+    def handle(self, *args, **options):
+        fix = not options["dry_run"]
+        for model, field, counted_model, counted_field in COUNTERS:
+            with transaction.atomic():
+                drifted = recount_counter(
+                    model, field, counted_model, counted_field, fix
+                )
+            action = "исправлено" if fix else "найдено"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.label}.{field}: "
+                    f"{action} расхождений: {drifted}"
+                )
+            )
@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-18 12:00
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def fix_short_url_codes(apps, schema_editor):
+    """
+    Перед добавлением уникальности заменяем пустые и повторяющиеся коды
+    на коды из id рецепта.
+    """
+    from recipes.short_code_generator import encode_short_code
+
+    Recipe = apps.get_model('recipes', 'Recipe')
+    codes = Counter(
+        Recipe.objects.exclude(short_url_code='').values_list(
+            'short_url_code', flat=True
+        )
+    )
+    duplicated = [code for code, count in codes.items() if count > 1]
+    recipes = Recipe.objects.filter(
+        models.Q(short_url_code='') | models.Q(short_url_code__in=duplicated)
+    ).order_by('id')
+    kept_codes = set()
+    for recipe in recipes:
+        if recipe.short_url_code and recipe.short_url_code not in kept_codes:
+            # Первый рецепт с повторяющимся кодом сохраняет свою ссылку
+            kept_codes.add(recipe.short_url_code)
+            continue
+        recipe.short_url_code = encode_short_code(recipe.pk)
+        recipe.save(update_fields=['short_url_code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_url_code',
+            field=models.CharField(blank=True, max_length=8, null=True, verbose_name='Набор символов для короткой ссылки'),
+        ),
+        migrations.RunPython(fix_short_url_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_url_code',
+            field=models.CharField(blank=True, max_length=8, null=True, unique=True, verbose_name='Набор символов для короткой ссылки'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+def remove_duplicate_recipe_tags(apps, schema_editor):
+    """Перед добавлением уникальности удаляем повторы тегов рецепта."""
+    RecipeTag = apps.get_model('recipes', 'RecipeTag')
+    RecipeTag.objects.filter(
+        models.Exists(
+            RecipeTag.objects.filter(
+                recipe=models.OuterRef('recipe'),
+                tag=models.OuterRef('tag'),
+                id__lt=models.OuterRef('id'),
+            )
+        )
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_short_url_code_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at', '-id'], name='recipe_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created_at'], name='recipe_author_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tag', 'recipe'], name='recipetag_tag_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_recipe_tags, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='recipetag',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='recipetag_unique'),
+        ),
+    ]
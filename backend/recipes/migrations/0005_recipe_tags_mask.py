@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 14:10
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_tags_mask(apps, schema_editor):
+    """Заполняем маску тегов существующих рецептов."""
+    from recipes.models import TAGS_MASK_UPDATE_BATCH_SIZE, get_tags_mask
+
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeTag = apps.get_model('recipes', 'RecipeTag')
+    masks = defaultdict(int)
+    recipe_tags = RecipeTag.objects.values_list('recipe_id', 'tag_id')
+    for recipe_id, tag_id in recipe_tags.iterator():
+        masks[recipe_id] |= get_tags_mask([tag_id]) or 0
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        if mask:
+            recipes_by_mask[mask].append(recipe_id)
+    batch_size = TAGS_MASK_UPDATE_BATCH_SIZE
+    for mask, recipe_ids in recipes_by_mask.items():
+        for start in range(0, len(recipe_ids), batch_size):
+            Recipe.objects.filter(
+                id__in=recipe_ids[start:start + batch_size]
+            ).update(tags_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Битовая маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняем счётчики по существующим данным."""
+    from recipes.counters import recount_counter
+
+    Recipe = apps.get_model('recipes', 'Recipe')
+    UserFavorite = apps.get_model('recipes', 'UserFavorite')
+    UserShoppingList = apps.get_model('recipes', 'UserShoppingList')
+    User = apps.get_model('users', 'FoodgramUser')
+    UserSubscriptions = apps.get_model('users', 'UserSubscriptions')
+    recount_counter(Recipe, 'favorites_count', UserFavorite, 'recipe')
+    recount_counter(
+        Recipe, 'shopping_cart_count', UserShoppingList, 'recipe'
+    )
+    recount_counter(User, 'recipes_count', Recipe, 'author')
+    recount_counter(
+        User, 'followers_count', UserSubscriptions, 'subscription'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_foodgramuser_counters'),
+        ('recipes', '0005_recipe_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 3.2 on 2026-10-18 02:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = '''
+    setweight(to_tsvector('russian', coalesce({row}name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce({row}text, '')), 'B')
+'''
+
+CREATE_TRIGGER_SQL = f'''
+CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+
+UPDATE recipes_recipe SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};
+
+CREATE INDEX recipe_search_idx ON recipes_recipe USING gin (search_vector);
+'''
+
+DROP_TRIGGER_SQL = '''
+DROP INDEX IF EXISTS recipe_search_idx;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+'''
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    Поисковый вектор поддерживает триггер, поэтому он обновляется
+    и при save(), и при QuerySet.update(), и при загрузке данных.
+    На других СУБД поиск работает без вектора.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    create_search_trigger, drop_search_trigger
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+                ),
+            ],
+        ),
+    ]
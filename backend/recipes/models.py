@@ -1,15 +1,44 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 from recipes.constants import (MAX_AMOUNT, MEASUREMENT_NAME_MAX_LENGHT,
                                MIN_AMOUNT, NAME_MAX_LENGHT,
                                SHORT_URL_CODE_MAX_LENGTH, TAG_NAME_MAX_LENGHT,
-                               MeasurementUnit)
-from recipes.short_code_generator import generate_short_code
+                               TAGS_MASK_BITS, MeasurementUnit)
+from recipes.short_code_generator import encode_short_code
+from recipes.short_links import short_link_cache
+from users.mixins import DenormalizedFieldsMixin
+from users.models import UserSubscriptions
 
 User = get_user_model()
 
+# Сколько id рецептов передавать в одном UPDATE
+TAGS_MASK_UPDATE_BATCH_SIZE = 500
+
+
+def get_tags_mask(tag_ids):
+    """
+    Получаем битовую маску набора тегов.
+
+    Тегу с id n соответствует бит n - 1. Если хотя бы один тег
+    в маску не помещается, возвращаем None.
+    """
+    mask = 0
+    for tag_id in tag_ids:
+        if not 0 < tag_id <= TAGS_MASK_BITS:
+            return None
+        mask |= 1 << (tag_id - 1)
+    return mask
+
 
 class Ingredient(models.Model):
     """Модель ингредиентов."""
@@ -57,11 +86,127 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet рецептов."""
+
+    def with_related(self):
+        """
+        Загружаем автора, теги и ингредиенты рецептов
+        фиксированным числом запросов.
+        """
+        return self.select_related("author").prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.only("id", "name", "slug")),
+            Prefetch(
+                "recipeingredient",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ).only(
+                    "amount",
+                    "recipe_id",
+                    "ingredient__id",
+                    "ingredient__name",
+                    "ingredient__measurement_unit",
+                ),
+            ),
+        )
+
+    def for_card(self, *fields):
+        """Оставляем только поля краткой карточки рецепта."""
+        return self.only(
+            "id", "name", "image", "image_renditions", "cooking_time", *fields
+        )
+
+    def limited_per_author(self, author_ids, limit=None):
+        """
+        Оставляем не больше limit последних рецептов каждого автора.
+
+        Рецепты нумеруются внутри автора оконной функцией ROW_NUMBER,
+        так что выборка для всех авторов делается одним запросом.
+        """
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return queryset
+        ranked = Recipe.objects.filter(author_id__in=author_ids).annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=F("author_id"),
+                order_by=(F("created_at").desc(), F("id").desc()),
+            )
+        ).order_by().values("id", "recipe_rank")
+        sql, params = ranked.query.sql_with_params()
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT ranked.id FROM ({sql}) ranked "
+            "WHERE ranked.recipe_rank <= %s",
+            (*params, limit),
+        ))
+
+    def update_tags_mask(self):
+        """
+        Пересчитываем битовую маску тегов рецептов.
+
+        Рецепты группируются по значению маски, поэтому запросов
+        UPDATE выполняется по числу различных наборов тегов.
+        """
+        masks = dict.fromkeys(self.values_list("id", flat=True), 0)
+        recipe_tags = RecipeTag.objects.filter(
+            recipe__in=self.values("id")
+        ).values_list("recipe_id", "tag_id")
+        for recipe_id, tag_id in recipe_tags.iterator():
+            masks[recipe_id] |= get_tags_mask([tag_id]) or 0
+        recipes_by_mask = defaultdict(list)
+        for recipe_id, mask in masks.items():
+            recipes_by_mask[mask].append(recipe_id)
+        for mask, recipe_ids in recipes_by_mask.items():
+            batch_size = TAGS_MASK_UPDATE_BATCH_SIZE
+            for start in range(0, len(recipe_ids), batch_size):
+                Recipe.objects.filter(
+                    id__in=recipe_ids[start:start + batch_size]
+                ).update(tags_mask=mask)
+
+    def with_user_flags(self, user):
+        """
+        Добавляем к рецептам флаги is_favorited, is_in_shopping_cart
+        и author_is_subscribed для переданного пользователя.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                author_is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                UserFavorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                UserShoppingList.objects.filter(
+                    user=user, recipe=OuterRef("pk")
+                )
+            ),
+            author_is_subscribed=Exists(
+                UserSubscriptions.objects.filter(
+                    user=user, subscription=OuterRef("author")
+                )
+            ),
+        )
+
+
+class RecipeManager(models.Manager.from_queryset(RecipeQuerySet)):
+    """Менеджер рецептов."""
+
+    def get_queryset(self):
+        # Поисковый вектор нужен только в условиях запросов
+        return super().get_queryset().defer("search_vector")
+
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     """Модель рецептов."""
 
     name = models.CharField("Название", max_length=NAME_MAX_LENGHT)
     image = models.ImageField("Картинка", upload_to="recipes/images")
+    image_renditions = models.JSONField(
+        "Варианты картинки", default=dict, blank=True, editable=False
+    )
     text = models.TextField("Описание")
     cooking_time = models.PositiveSmallIntegerField(
         "Время приготовления",
@@ -73,7 +218,23 @@ class Recipe(models.Model):
     created_at = models.DateTimeField("Время добавления", auto_now_add=True)
     short_url_code = models.CharField(
         "Набор символов для короткой ссылки",
-        max_length=SHORT_URL_CODE_MAX_LENGTH
+        max_length=SHORT_URL_CODE_MAX_LENGTH,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    tags_mask = models.BigIntegerField(
+        "Битовая маска тегов", default=0, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        "Добавлений в избранное", default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        "Добавлений в список покупок", default=0, editable=False
+    )
+    # Заполняется триггером PostgreSQL из name (вес A) и text (вес B)
+    search_vector = SearchVectorField(
+        "Поисковый вектор", null=True, editable=False
     )
     author = models.ForeignKey(
         User,
@@ -93,19 +254,49 @@ class Recipe(models.Model):
         related_name="tags_recipes"
     )
 
+    objects = RecipeManager()
+
+    denormalized_fields = (
+        "image_renditions",
+        "tags_mask",
+        "favorites_count",
+        "shopping_cart_count",
+        "search_vector",
+    )
+
     class Meta:
         verbose_name = "рецепт"
         verbose_name_plural = "Рецепты"
         default_related_name = "recipes"
         ordering = ("-created_at",)
+        indexes = [
+            # Сортировка списка и курсорная пагинация
+            models.Index(
+                fields=("-created_at", "-id"), name="recipe_created_at_idx"
+            ),
+            # Фильтр по автору и последние рецепты в подписках
+            models.Index(
+                fields=("author", "-created_at"),
+                name="recipe_author_created_at_idx",
+            ),
+            # Полнотекстовый поиск
+            GinIndex(fields=("search_vector",), name="recipe_search_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.short_url_code:
-            self.short_url_code = generate_short_code()
-        return super().save(*args, **kwargs)
+        if self.short_url_code:
+            return super().save(*args, **kwargs)
+        # Код получается из id, поэтому проставляем его после вставки
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            self.short_url_code = encode_short_code(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_url_code=self.short_url_code
+            )
+        short_link_cache.set(self.short_url_code, self.pk)
 
 
 # Эта модель нужна, чтобы добавить inlines в админку
@@ -124,6 +315,15 @@ class RecipeTag(models.Model):
 
     class Meta:
         default_related_name = "recipetag"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "tag"), name="recipetag_unique"
+            )
+        ]
+        indexes = [
+            # Поиск рецептов по тегу без обращения к таблице
+            models.Index(fields=("tag", "recipe"), name="recipetag_tag_idx"),
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -0,0 +1,143 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from recipes.constants import (AVATAR_THUMB_SIZE, RECIPE_DETAIL_SIZE,
+                               RECIPE_THUMB_SIZE)
+
+RENDITIONS_DIRECTORY = "renditions"
+
+
+class Rendition:
+    """
+    Вариант изображения фиксированного размера.
+
+    При crop=True изображение обрезается точно под размер,
+    иначе уменьшается с сохранением пропорций.
+    """
+
+    save_options = {
+        "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+        "WEBP": {"quality": 80, "method": 4},
+    }
+    extensions = {"JPEG": "jpg", "WEBP": "webp"}
+
+    def __init__(self, name, size, image_format, crop=False):
+        self.name = name
+        self.size = size
+        self.image_format = image_format
+        self.crop = crop
+
+    def get_path(self, original_name):
+        """Путь варианта рядом с оригиналом."""
+        directory, filename = os.path.split(original_name)
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(
+            directory,
+            RENDITIONS_DIRECTORY,
+            f"{stem}_{self.name}.{self.extensions[self.image_format]}",
+        )
+
+    def render(self, image):
+        if self.crop:
+            image = ImageOps.fit(image, self.size, Image.LANCZOS)
+        else:
+            image = image.copy()
+            image.thumbnail(self.size, Image.LANCZOS)
+        if self.image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        output = BytesIO()
+        image.save(
+            output, self.image_format, **self.save_options[self.image_format]
+        )
+        return output.getvalue()
+
+
+# Варианты изображений по имени поля модели
+RENDITIONS = {
+    "image": (
+        Rendition("thumb", RECIPE_THUMB_SIZE, "JPEG", crop=True),
+        Rendition("thumb_webp", RECIPE_THUMB_SIZE, "WEBP", crop=True),
+        Rendition("detail", RECIPE_DETAIL_SIZE, "JPEG"),
+        Rendition("detail_webp", RECIPE_DETAIL_SIZE, "WEBP"),
+    ),
+    "avatar": (
+        Rendition("thumb", AVATAR_THUMB_SIZE, "JPEG", crop=True),
+        Rendition("thumb_webp", AVATAR_THUMB_SIZE, "WEBP", crop=True),
+    ),
+}
+
+RENDITIONS_BY_NAME = {
+    field_name: {rendition.name: rendition for rendition in renditions}
+    for field_name, renditions in RENDITIONS.items()
+}
+
+
+def open_image(file, renditions):
+    """
+    Открываем изображение, учитывая поворот из EXIF.
+
+    JPEG сразу декодируется в уменьшенном масштабе,
+    достаточном для самого крупного варианта.
+    """
+    image = Image.open(file)
+    largest = max(rendition.size for rendition in renditions)
+    image.draft("RGB", largest)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert(
+            "RGBA" if "transparency" in image.info else "RGB"
+        )
+    return image
+
+
+def make_renditions(instance, field_name):
+    """
+    Создаём варианты изображения из поля field_name
+    и сохраняем их пути в поле <field_name>_renditions.
+
+    Файлы вариантов прежнего изображения удаляются.
+    """
+    file = getattr(instance, field_name)
+    renditions_field = f"{field_name}_renditions"
+    old_paths = set(getattr(instance, renditions_field).values())
+    paths = {}
+    if file:
+        renditions = RENDITIONS[field_name]
+        with file.open("rb"):
+            image = open_image(file, renditions)
+            image.load()
+        for rendition in renditions:
+            path = rendition.get_path(file.name)
+            if file.storage.exists(path):
+                file.storage.delete(path)
+            paths[rendition.name] = file.storage.save(
+                path, ContentFile(rendition.render(image))
+            )
+    type(instance)._default_manager.filter(pk=instance.pk).update(
+        **{renditions_field: paths}
+    )
+    setattr(instance, renditions_field, paths)
+    for path in old_paths - set(paths.values()):
+        file.storage.delete(path)
+    return paths
+
+
+def get_rendition_url(instance, field_name, rendition_name):
+    """
+    URL варианта изображения, а если его ещё нет — оригинала.
+
+    Пока варианты нового изображения создаются в фоне, в поле
+    остаются пути вариантов прежнего, их не используем.
+    """
+    file = getattr(instance, field_name)
+    if not file:
+        return None
+    renditions = getattr(instance, f"{field_name}_renditions") or {}
+    path = renditions.get(rendition_name)
+    rendition = RENDITIONS_BY_NAME[field_name][rendition_name]
+    if path != rendition.get_path(file.name):
+        return file.url
+    return file.storage.url(path)
@@ -1,14 +1,78 @@
-import random
 import string
 
 from django.conf import settings
 
+CHARACTERS = string.digits + string.ascii_letters
+CHARACTER_INDEX = {char: index for index, char in enumerate(CHARACTERS)}
+# Количество различных кодов заданной длины
+MODULUS = len(CHARACTERS) ** settings.SHORT_CODE_LENGTH
+# Обратный множитель нужен для восстановления id из кода
+INVERSE_MULTIPLIER = pow(settings.SHORT_CODE_MULTIPLIER, -1, MODULUS)
 
-def generate_short_code(length=settings.SHORT_CODE_LENGTH):
-    """Генератор уникальных кодов"""
+
+def to_digits(value):
+    digits = []
+    for _ in range(settings.SHORT_CODE_LENGTH):
+        value, digit = divmod(value, len(CHARACTERS))
+        digits.append(digit)
+    return digits[::-1]
+
+
+def from_digits(digits):
+    value = 0
+    for digit in digits:
+        value = value * len(CHARACTERS) + digit
+    return value
+
+
+def permute(value):
+    return (
+        value * settings.SHORT_CODE_MULTIPLIER + settings.SHORT_CODE_OFFSET
+    ) % MODULUS
+
+
+def unpermute(value):
+    return (value - settings.SHORT_CODE_OFFSET) * INVERSE_MULTIPLIER % MODULUS
+
+
+def encode_short_code(pk):
+    """
+    Получаем код короткой ссылки из id рецепта.
+
+    id переставляется обратимым преобразованием по модулю количества
+    кодов (аффинная перестановка, разворот цифр base62 и снова аффинная
+    перестановка), поэтому разные id всегда дают разные коды
+    и проверять их уникальность в БД не нужно.
+    """
+    if not 0 < pk < MODULUS:
+        raise ValueError(f"id {pk} не помещается в код короткой ссылки")
+    value = permute(from_digits(to_digits(permute(pk))[::-1]))
+    return "".join(CHARACTERS[digit] for digit in to_digits(value))
+
+
+def decode_short_code(code):
+    """Восстанавливаем id рецепта из кода, None — если код не наш."""
+    if len(code) != settings.SHORT_CODE_LENGTH:
+        return None
+    if any(char not in CHARACTER_INDEX for char in code):
+        return None
+    value = unpermute(from_digits(CHARACTER_INDEX[char] for char in code))
+    return unpermute(from_digits(to_digits(value)[::-1]))
+
+
+def fill_missing_short_codes(batch_size=1000):
+    """
+    Проставляем коды рецептам, сохранённым без кода
+    (например, через bulk_create при импорте).
+    """
     from recipes.models import Recipe
-    characters = string.ascii_letters + string.digits
-    while True:
-        code = ''.join(random.choice(characters) for _ in range(length))
-        if not Recipe.objects.filter(short_url_code=code).exists():
-            return code
+    recipes = Recipe.objects.filter(short_url_code__isnull=True).only("id")
+    batch = []
+    for recipe in recipes.iterator(chunk_size=batch_size):
+        recipe.short_url_code = encode_short_code(recipe.pk)
+        batch.append(recipe)
+        if len(batch) == batch_size:
+            Recipe.objects.bulk_update(batch, ["short_url_code"])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ["short_url_code"])
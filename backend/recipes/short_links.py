@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ShortLinkCache:
+    """
+    Ограниченный LRU-кэш соответствия кодов коротких ссылок и id рецептов.
+
+    Найденные коды живут не дольше ttl секунд: удаление рецепта
+    сбрасывает запись только в своём процессе, остальные перечитают
+    код из БД после истечения срока. Отсутствующие коды тоже
+    запоминаются, но ненадолго, чтобы повторные запросы
+    несуществующих ссылок не шли в БД.
+    """
+
+    def __init__(self, maxsize, ttl, missing_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.entries = OrderedDict()
+        self.missing = OrderedDict()
+        self.lock = threading.Lock()
+        self.warmed = False
+
+    def get(self, code):
+        """Получаем id рецепта или None, если кода нет в кэше."""
+        with self.lock:
+            entry = self.entries.get(code)
+            if entry is None:
+                return None
+            recipe_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[code]
+                return None
+            self.entries.move_to_end(code)
+            return recipe_id
+
+    def is_missing(self, code):
+        """Проверяем, что код недавно не был найден в БД."""
+        with self.lock:
+            expires_at = self.missing.get(code)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self.missing[code]
+                return False
+            return True
+
+    def set(self, code, recipe_id):
+        with self.lock:
+            self.missing.pop(code, None)
+            self.entries[code] = (recipe_id, time.monotonic() + self.ttl)
+            self.entries.move_to_end(code)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def set_missing(self, code):
+        with self.lock:
+            self.missing[code] = time.monotonic() + self.missing_ttl
+            self.missing.move_to_end(code)
+            while len(self.missing) > self.maxsize:
+                self.missing.popitem(last=False)
+
+    def discard(self, code):
+        with self.lock:
+            self.entries.pop(code, None)
+
+    def warm(self):
+        """Загружаем коды самых новых рецептов."""
+        from recipes.models import Recipe
+        self.warmed = True
+        recipes = Recipe.objects.exclude(
+            short_url_code__isnull=True
+        ).order_by("-created_at").values_list("short_url_code", "id")
+        for code, recipe_id in reversed(recipes[:self.maxsize]):
+            self.set(code, recipe_id)
+
+
+short_link_cache = ShortLinkCache(
+    maxsize=settings.SHORT_LINK_CACHE_SIZE,
+    ttl=settings.SHORT_LINK_CACHE_TTL,
+    missing_ttl=settings.SHORT_LINK_MISSING_TTL,
+)
+
+
+def resolve_short_code(code):
+    """Получаем id рецепта по коду короткой ссылки или None."""
+    from recipes.models import Recipe
+    if not short_link_cache.warmed:
+        short_link_cache.warm()
+    recipe_id = short_link_cache.get(code)
+    if recipe_id is not None:
+        return recipe_id
+    if short_link_cache.is_missing(code):
+        return None
+    # Индексный поиск, из строки рецепта читается только id
+    recipe_ids = list(
+        Recipe.objects.filter(short_url_code=code).order_by().values_list(
+            "id", flat=True
+        )[:1]
+    )
+    if not recipe_ids:
+        short_link_cache.set_missing(code)
+        return None
+    short_link_cache.set(code, recipe_ids[0])
+    return recipe_ids[0]
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.constants import TAGS_MASK_BITS
+from recipes.models import (Recipe, RecipeTag, UserFavorite, UserShoppingList,
+                            get_tags_mask)
+from recipes.short_links import short_link_cache
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_code(sender, instance, **kwargs):
+    """Удаляем код короткой ссылки удалённого рецепта из кэша."""
+    if instance.short_url_code:
+        short_link_cache.discard(instance.short_url_code)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def add_tags_to_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Добавляем теги в маску рецептов после recipe.tags.add() и set().
+
+    Удаление тегов обрабатывается сигналом post_delete модели RecipeTag.
+    """
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        tag_ids, recipes = [instance.pk], Recipe.objects.filter(id__in=pk_set)
+    else:
+        tag_ids, recipes = pk_set, Recipe.objects.filter(pk=instance.pk)
+    mask = get_tags_mask(
+        tag_id for tag_id in tag_ids if tag_id <= TAGS_MASK_BITS
+    )
+    if mask:
+        recipes.update(tags_mask=F("tags_mask").bitor(mask))
+
+
+@receiver(post_save, sender=RecipeTag)
+def update_recipe_tags_mask(sender, instance, **kwargs):
+    """Пересчитываем маску рецепта после изменения тега в админке."""
+    Recipe.objects.filter(pk=instance.recipe_id).update_tags_mask()
+
+
+@receiver(post_delete, sender=RecipeTag)
+def remove_tag_from_mask(sender, instance, **kwargs):
+    mask = get_tags_mask([instance.tag_id])
+    if mask is not None:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            tags_mask=F("tags_mask").bitand(~mask)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        User.change_counter(instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    User.change_counter(instance.author_id, "recipes_count", -1)
+
+
+# Счётчики рецепта для каждого списка пользователя
+LIST_COUNTERS = {
+    UserFavorite: "favorites_count",
+    UserShoppingList: "shopping_cart_count",
+}
+
+
+def increment_list_counter(sender, instance, created, **kwargs):
+    if created:
+        Recipe.change_counter(instance.recipe_id, LIST_COUNTERS[sender], 1)
+
+
+def decrement_list_counter(sender, instance, **kwargs):
+    Recipe.change_counter(instance.recipe_id, LIST_COUNTERS[sender], -1)
+
+
+for model in LIST_COUNTERS:
+    post_save.connect(increment_list_counter, sender=model)
+    post_delete.connect(decrement_list_counter, sender=model)
@@ -0,0 +1,20 @@
+from django.apps import apps
+
+from jobs.queue import task
+from recipes.renditions import make_renditions
+
+
+@task("recipes.make_renditions", timeout=120)
+def make_renditions_task(model, pk, field_name):
+    """Создаём варианты изображения объекта в фоне."""
+    instance = apps.get_model(model)._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return None
+    return make_renditions(instance, field_name)
+
+
+def make_renditions_later(instance, field_name):
+    """Ставим создание вариантов изображения в очередь."""
+    return make_renditions_task.enqueue(
+        model=instance._meta.label, pk=instance.pk, field_name=field_name
+    )
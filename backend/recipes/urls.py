@@ -3,6 +3,10 @@ from django.urls import path
 
 from recipes import views
 
+expand = (
+    views.async_expand if settings.SERVER_MODE == 'asgi' else views.expand
+)
+
 urlpatterns = [
-    path(f'{settings.SHORT_LINK_URL_PATH}/<str:uniq_id>/', views.expand),
+    path(f'{settings.SHORT_LINK_URL_PATH}/<str:uniq_id>/', expand),
 ]
@@ -1,15 +1,38 @@
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 
-from recipes.models import Recipe
+from recipes.short_links import resolve_short_code, short_link_cache
+
+
+def redirect_to_recipe(request, recipe_id):
+    return HttpResponseRedirect(
+        request.build_absolute_uri(f"/recipes/{recipe_id}/")
+    )
 
 
 def expand(request, uniq_id):
     """Представление для коротких ссылок."""
     try:
-        recipe = get_object_or_404(Recipe, short_url_code=uniq_id)
-        return HttpResponseRedirect(
-            request.build_absolute_uri(f"/recipes/{recipe.id}/")
-        )
+        recipe_id = resolve_short_code(uniq_id)
+        if recipe_id is None:
+            raise Http404("No Recipe matches the given query.")
+        return redirect_to_recipe(request, recipe_id)
     except Exception as e:
         return HttpResponse(e.args)
+
+
+async def async_expand(request, uniq_id):
+    """
+    Асинхронный вариант expand для режима ASGI.
+
+    Коды из кэша процесса обрабатываются в цикле событий,
+    остальные — синхронным представлением в отдельном потоке.
+    """
+    recipe_id = None
+    if short_link_cache.warmed:
+        recipe_id = short_link_cache.get(uniq_id)
+    if recipe_id is None:
+        return await sync_to_async(expand, thread_sensitive=True)(
+            request, uniq_id
+        )
+    return redirect_to_recipe(request, recipe_id)
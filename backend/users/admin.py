@@ -10,6 +10,15 @@ class FoodgramUserAdmin(UserAdmin):
     """Отображение пользователей."""
 
     search_fields = ("username", "email")
+    list_display = (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "is_staff",
+        "recipes_count",
+        "followers_count",
+    )
 
 
 admin.site.register(User, FoodgramUserAdmin)
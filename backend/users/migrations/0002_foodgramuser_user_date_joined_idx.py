@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodgramuser',
+            index=models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+        ),
+    ]
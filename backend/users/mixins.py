@@ -0,0 +1,41 @@
+from django.db.models import F
+
+
+class DenormalizedFieldsMixin:
+    """
+    Модель с полями, которые обновляются только запросами UPDATE.
+
+    Такие поля (счётчики, маски) меняются F()-выражениями в БД,
+    поэтому при обычном save() объекта они не перезаписываются
+    устаревшими значениями из памяти.
+    """
+
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def change_counter(cls, pk, field, delta):
+        """
+        Изменяем счётчик объекта на delta одним запросом UPDATE.
+
+        Счётчик не опускается ниже нуля, расхождения с реальным
+        количеством исправляет команда recount_counters.
+        """
+        objects = cls._default_manager.filter(pk=pk)
+        if delta < 0:
+            objects = objects.filter(**{f"{field}__gte": -delta})
+        objects.update(**{field: F(field) + delta})
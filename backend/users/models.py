@@ -6,9 +6,10 @@ from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
 from users.constants import NAMES_MAX_LENGTH
+from users.mixins import DenormalizedFieldsMixin
 
 
-class FoodgramUser(AbstractUser):
+class FoodgramUser(DenormalizedFieldsMixin, AbstractUser):
     """Модель пользователя."""
 
     # Делаем поля модели обязательными
@@ -16,6 +17,9 @@ class FoodgramUser(AbstractUser):
     last_name = models.CharField(_("last name"), max_length=NAMES_MAX_LENGTH)
     email = models.EmailField(_("email address"), unique=True)
     avatar = models.ImageField(_("avatar"), upload_to="users", blank=True)
+    avatar_renditions = models.JSONField(
+        "Варианты аватара", default=dict, blank=True, editable=False
+    )
     subscriptions = models.ManyToManyField(
         "self",
         through="UserSubscriptions",
@@ -23,12 +27,28 @@ class FoodgramUser(AbstractUser):
         related_name="user",
         symmetrical=False
     )
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков", default=0, editable=False
+    )
+
+    denormalized_fields = (
+        "avatar_renditions", "recipes_count", "followers_count"
+    )
 
     REQUIRED_FIELDS = ("first_name", "last_name", "username")
     USERNAME_FIELD = "email"
 
     class Meta:
         ordering = ("username",)
+        indexes = [
+            # Курсорная пагинация пользователей
+            models.Index(
+                fields=("-date_joined", "-id"), name="user_date_joined_idx"
+            ),
+        ]
 
     def get_absolute_url(self):
         return reverse("users:profile")
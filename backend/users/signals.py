@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import FoodgramUser, UserSubscriptions
+
+
+@receiver(post_save, sender=UserSubscriptions)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        FoodgramUser.change_counter(
+            instance.subscription_id, "followers_count", 1
+        )
+
+
+@receiver(post_delete, sender=UserSubscriptions)
+def decrement_followers_count(sender, instance, **kwargs):
+    FoodgramUser.change_counter(
+        instance.subscription_id, "followers_count", -1
+    )